@@ -147,7 +147,7 @@ def reflection_coeff(angle, rho1, c1, alpha=0, rho=density(), c=soundspeed()):
     t1 = m*_np.cos(angle)
     t2 = _np.sqrt(n**2-_np.sin(angle)**2)
     V = (t1-t2)/(t1+t2)
-    return V.real if V.imag == 0 else V
+    return V.real if _np.all(V.imag == 0) else V
 
 def doppler(speed, frequency, c=soundspeed()):
     """Get the Doppler-shifted frequency given relative speed between transmitter and receiver.
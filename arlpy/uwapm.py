@@ -20,15 +20,31 @@ must be installed on your computer and `bellhop.exe` should be in your PATH.
 """
 
 import os as _os
-import re as _re
+import shutil as _shutil
+import glob as _glob
+import hashlib as _hashlib
+import pickle as _pickle
+import json as _json
+import threading as _threading
+import functools as _functools
+import itertools as _itertools
+import weakref as _weakref
+import collections as _collections
+import asyncio as _asyncio
+import time as _time
+import warnings as _warnings
 import subprocess as _proc
 import numpy as _np
 from scipy import interpolate as _interp
+import scipy.signal as _sp
+import scipy.sparse as _sparse
 import pandas as _pd
-from tempfile import mkstemp as _mkstemp
+import concurrent.futures as _futures
+from tempfile import mkstemp as _mkstemp, gettempdir as _gettempdir
 from struct import unpack as _unpack
 from sys import float_info as _fi
 import arlpy.plot as _plt
+import arlpy.uwa as _uwa
 import bokeh as _bokeh
 
 # constants
@@ -41,10 +57,44 @@ rays = 'rays'
 coherent = 'coherent'
 incoherent = 'incoherent'
 semicoherent = 'semicoherent'
+geometric = 'geometric'
+gaussian = 'gaussian'
 
 # models (in order of preference)
 _models = []
 
+# on-disk cache of model results
+_cache = {
+    'enabled': True,
+    'path': _os.path.join(_os.path.expanduser('~'), '.cache', 'arlpy', 'uwapm'),
+    'max_size': 1024*1024*1024
+}
+_cache_lock = _threading.Lock()
+
+# scratch workspace for model working files
+_workspace = {
+    'path': _os.path.join(_gettempdir(), 'arlpy-uwapm')
+}
+
+# default time limit on model runs (s)
+_timeout = None
+
+# callback to receive timing and size statistics of model runs
+_stats_hook = None
+
+# limit on concurrent model runs through the asyncio API
+_async_workers = _os.cpu_count() or 1
+_async_semaphores = _weakref.WeakKeyDictionary()
+
+# recently formatted sections of model input files, reused across runs in a sweep
+_sections = _collections.OrderedDict()
+_sections_lock = _threading.Lock()
+_sections_max = 32
+
+# model availability, probed once per process
+_probes = {}
+_probes_lock = _threading.Lock()
+
 def create_env2d(**kv):
     """Create a new 2D underwater environment.
 
@@ -76,6 +126,13 @@ def create_env2d(**kv):
 
     >>> import arlpy.uwapm as pm
     >>> env = pm.create_env2d(depth=[[0,20], [300,10], [500,18], [1000,15]])
+
+    By default, the propagation model chooses the number of beams and the ray step
+    size. Fewer beams and a larger step size are faster but less accurate (see
+    :func:`arlpy.uwapm.tune_env`):
+
+    >>> import arlpy.uwapm as pm
+    >>> env = pm.create_env2d(nbeams=200, step=5, beam_type=pm.gaussian)
     """
     env = {
         'name': 'arlpy',
@@ -96,7 +153,10 @@ def create_env2d(**kv):
         'depth': 25,                    # m
         'depth_interp': linear,         # curvilinear/linear
         'min_angle': -80,               # deg
-        'max_angle': 80                 # deg
+        'max_angle': 80,                # deg
+        'nbeams': 0,                    # number of beams (0 = auto)
+        'step': 0,                      # m (0 = auto)
+        'beam_type': None               # None/geometric/gaussian
     }
     for k, v in kv.items():
         if k not in env.keys():
@@ -154,6 +214,9 @@ def check_env2d(env):
             assert env['tx_directionality'].ndim == 2, 'tx_directionality must be an Nx2 array'
             assert env['tx_directionality'].shape[1] == 2, 'tx_directionality must be an Nx2 array'
             assert _np.all(env['tx_directionality'][:,0] >= -180) and _np.all(env['tx_directionality'][:,0] <= 180), 'tx_directionality angles must be in [-90, 90]'
+        assert env.get('nbeams', 0) >= 0 and int(env.get('nbeams', 0)) == env.get('nbeams', 0), 'nbeams must be a non-negative integer'
+        assert env.get('step', 0) >= 0, 'step must be non-negative'
+        assert env.get('beam_type') in [None, geometric, gaussian], 'Invalid beam type: '+str(env.get('beam_type'))
     except AssertionError as e:
         raise ValueError(e.args)
 
@@ -274,12 +337,180 @@ def plot_ssp(env, **kwargs):
         s = env['soundspeed']
         _plt.plot(s[:,1], -s[:,0], xlabel='Soundspeed (m/s)', ylabel='Depth (m)', **kwargs)
 
-def compute_arrivals(env, model=None, debug=False):
+def simplify_ssp(env, tolerance=None, time_tolerance=None):
+    """Simplify the sound speed profile of an environment.
+
+    :param env: environment definition
+    :param tolerance: maximum sound speed error (m/s), or None
+    :param time_tolerance: maximum vertical travel time error (s), or None
+    :returns: environment with simplified sound speed profile, maximum sound speed error (m/s), maximum vertical travel time error (s)
+
+    The sound speed profile is reduced to a subset of its points, chosen so that the
+    profile (interpolated as per `soundspeed_interp`) stays within `tolerance` of the
+    original profile at every depth, and the one-way vertical travel time from the
+    surface to every depth stays within `time_tolerance` of that for the original
+    profile. At least one of the tolerances must be specified. Linear profiles are
+    simplified using the Douglas-Peucker algorithm, and points are then added one at
+    a time where the error is largest until the tolerances are met. The first and last
+    points are always kept, and at least 4 points are kept. Simpler profiles make
+    smaller environment files and faster model runs.
+
+    The environment passed in is not modified.
+
+    >>> import arlpy.uwapm as pm
+    >>> import numpy as np
+    >>> z = np.linspace(0, 100, 5000)
+    >>> env = pm.create_env2d(depth=100, soundspeed=np.column_stack((z, 1500+20*np.exp(-z/20))))
+    >>> env, err, terr = pm.simplify_ssp(env, tolerance=0.05)
+    >>> env['soundspeed'].shape
+    (7, 2)
+    """
+    if tolerance is None and time_tolerance is None:
+        raise ValueError('tolerance or time_tolerance must be specified')
+    env = dict(env)
+    if _np.size(env['soundspeed']) == 1:
+        return env, 0.0, 0.0
+    svp = _np.asarray(env['soundspeed'], dtype=_np.float64)
+    n = svp.shape[0]
+    is_spline = env['soundspeed_interp'] == spline
+    # evaluate errors at the original points, and between them for splines
+    if is_spline:
+        z = _np.sort(_np.concatenate((svp[:,0], (svp[1:,0]+svp[:-1,0])/2)))
+        c = _interp.splev(z, _interp.splrep(svp[:,0], svp[:,1], s=0))
+    else:
+        z = svp[:,0]
+        c = svp[:,1]
+    keep = _np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    if not is_spline and tolerance is not None:
+        keep = _douglas_peucker(svp, tolerance)
+    while True:
+        ndx = _np.nonzero(keep)[0]
+        if len(ndx) < 4:
+            e = _np.abs(_np.interp(svp[:,0], svp[ndx,0], svp[ndx,1]) - svp[:,1])
+        else:
+            cs = _ssp_eval(svp[ndx], z, is_spline)
+            ce = cs - c
+            te = _ssp_travel_time(z, cs) - _ssp_travel_time(z, c)
+            err = _np.max(_np.abs(ce))
+            terr = _np.max(_np.abs(te))
+            if (tolerance is None or err <= tolerance) and (time_tolerance is None or terr <= time_tolerance):
+                break
+            e = _np.abs(_ssp_eval(svp[ndx], svp[:,0], is_spline) - svp[:,1])
+        e[keep] = -1
+        if _np.max(e) < 0:
+            break
+        if _np.max(e) == 0:
+            # remaining points are exactly reproduced, add the one furthest from the kept points
+            e = _np.abs(_np.arange(n) - ndx[_np.clip(_np.searchsorted(ndx, _np.arange(n)), 1, len(ndx)-1)-1])
+            e[keep] = -1
+        keep[_np.argmax(e)] = True
+    env['soundspeed'] = svp[keep]
+    return env, err, terr
+
+def tune_env(env, task=arrivals, tolerance=1.0, settings=None, receivers=None, model=None, debug=False, timeout=None):
+    """Choose the fastest model accuracy settings that meet an accuracy tolerance.
+
+    :param env: environment definition
+    :param task: arrivals, or coherent/incoherent/semicoherent for transmission loss
+    :param tolerance: maximum error in received level (dB)
+    :param settings: list of dictionaries of settings (`nbeams`, `step`, `beam_type`), from fastest to most accurate (None for default)
+    :param receivers: (rx_depth, rx_range) of receivers to tune for (None to sample the receivers in the environment)
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for each model run in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :returns: environment with the chosen settings, maximum error in received level (dB)
+
+    The model is run for each of the `settings` on a small set of receivers, and the
+    results are compared against those for the last (most accurate) setting. The first
+    setting whose received level at every receiver is within `tolerance` of the most
+    accurate one is chosen. Received levels are the transmission loss for transmission
+    loss tasks, and the total power of all arrivals for the arrivals task, with levels
+    more than 60 dB below the strongest receiver treated as 60 dB below it. By default,
+    the number of beams is increased from 100 to 5000, with the ray step size chosen by
+    the model. If `receivers` is None, up to 5 receiver depths and 5 receiver ranges
+    are sampled evenly from those in the environment.
+
+    The environment passed in is not modified.
+
+    >>> import arlpy.uwapm as pm
+    >>> import numpy as np
+    >>> env = pm.create_env2d(rx_depth=np.arange(0, 25, 0.1), rx_range=np.arange(0, 5000, 1))
+    >>> env, err = pm.tune_env(env, task=pm.coherent, tolerance=2)
+    >>> tloss = pm.compute_transmission_loss(env)
+    """
+    check_env2d(env)
+    if task not in [arrivals, coherent, incoherent, semicoherent]:
+        raise ValueError('Unknown task: '+str(task))
+    if settings is None:
+        settings = [{'nbeams': n} for n in [100, 200, 500, 1000, 2000, 5000]]
+    if len(settings) == 0:
+        raise ValueError('No settings to tune')
+    if receivers is None:
+        receivers = [_sample_axis(env['rx_depth'], 5), _sample_axis(env['rx_range'], 5)]
+    sample = dict(env)
+    for k, v in zip(['rx_depth', 'rx_range'], receivers):
+        v = _np.asarray(v, dtype=_np.float64)
+        sample[k] = v if v.size > 1 else float(v)
+    def level(setting):
+        e = dict(sample, **setting)
+        check_env2d(e)
+        if task == arrivals:
+            a = compute_arrivals(e, model=model, debug=debug, timeout=timeout)
+            p = _np.zeros((_np.size(e['rx_depth']), _np.size(e['rx_range'])))
+            _np.add.at(p, (a.rx_depth_ndx.values.astype(_np.int64), a.rx_range_ndx.values.astype(_np.int64)), _np.abs(a.arrival_amplitude.values)**2)
+        else:
+            p = _np.abs(compute_transmission_loss(e, mode=task, model=model, debug=debug, timeout=timeout).values)**2
+        with _np.errstate(divide='ignore'):
+            return 10*_np.log10(p)
+    ref = level(settings[-1])
+    floor = _np.max(ref) - 60 if _np.any(_np.isfinite(ref)) else 0
+    ref = _np.maximum(ref, floor)
+    for setting in settings[:-1]:
+        err = _np.max(_np.abs(_np.maximum(level(setting), floor) - ref))
+        if err <= tolerance:
+            return dict(env, **setting), err
+    return dict(env, **settings[-1]), 0.0
+
+def _sample_axis(a, n):
+    a = _np.atleast_1d(a)
+    if a.size <= n:
+        return a
+    return a[_np.round(_np.linspace(0, a.size-1, n)).astype(_np.int64)]
+
+def _douglas_peucker(svp, tolerance):
+    keep = _np.zeros(svp.shape[0], dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, svp.shape[0]-1)]
+    while len(stack) > 0:
+        i, j = stack.pop()
+        if j-i < 2:
+            continue
+        seg = svp[i:j+1]
+        e = _np.abs(_np.interp(seg[:,0], seg[[0, -1],0], seg[[0, -1],1]) - seg[:,1])
+        k = _np.argmax(e)
+        if e[k] > tolerance:
+            keep[i+k] = True
+            stack.append((i, i+k))
+            stack.append((i+k, j))
+    return keep
+
+def _ssp_eval(svp, z, is_spline):
+    if is_spline:
+        return _interp.splev(z, _interp.splrep(svp[:,0], svp[:,1], s=0))
+    return _np.interp(z, svp[:,0], svp[:,1])
+
+def _ssp_travel_time(z, c):
+    return _np.concatenate(([0], _np.cumsum(_np.diff(z)*(1/c[1:]+1/c[:-1])/2)))
+
+def compute_arrivals(env, model=None, debug=False, timeout=None, cancel=None):
     """Compute arrivals between each transmitter and receiver.
 
     :param env: environment definition
     :param model: propagation model to use (None to auto-select)
     :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for the model in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :param cancel: `threading.Event` that cancels the model run when set (None for no cancellation)
     :returns: arrival times and coefficients for all transmitter-receiver combinations
 
     >>> import arlpy.uwapm as pm
@@ -289,11 +520,9 @@ def compute_arrivals(env, model=None, debug=False):
     """
     check_env2d(env)
     (model_name, model) = _select_model(env, arrivals, model)
-    if debug:
-        print('[DEBUG] Model: '+model_name)
-    return model.run(env, arrivals, debug)
+    return _run_model(model_name, model, env, arrivals, debug, timeout, cancel)
 
-def compute_eigenrays(env, tx_depth_ndx=0, rx_depth_ndx=0, rx_range_ndx=0, model=None, debug=False):
+def compute_eigenrays(env, tx_depth_ndx=0, rx_depth_ndx=0, rx_range_ndx=0, model=None, debug=False, timeout=None, cancel=None):
     """Compute eigenrays between a given transmitter and receiver.
 
     :param env: environment definition
@@ -302,6 +531,8 @@ def compute_eigenrays(env, tx_depth_ndx=0, rx_depth_ndx=0, rx_range_ndx=0, model
     :param rx_range_ndx: receiver range index
     :param model: propagation model to use (None to auto-select)
     :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for the model in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :param cancel: `threading.Event` that cancels the model run when set (None for no cancellation)
     :returns: eigenrays paths
 
     >>> import arlpy.uwapm as pm
@@ -310,25 +541,106 @@ def compute_eigenrays(env, tx_depth_ndx=0, rx_depth_ndx=0, rx_range_ndx=0, model
     >>> pm.plot_rays(rays, width=1000)
     """
     check_env2d(env)
-    env = env.copy()
-    if _np.size(env['tx_depth']) > 1:
-        env['tx_depth'] = env['tx_depth'][tx_depth_ndx]
-    if _np.size(env['rx_depth']) > 1:
-        env['rx_depth'] = env['rx_depth'][rx_depth_ndx]
-    if _np.size(env['rx_range']) > 1:
-        env['rx_range'] = env['rx_range'][rx_range_ndx]
+    env = _eigenray_env(env, tx_depth_ndx, rx_depth_ndx, rx_range_ndx)
     (model_name, model) = _select_model(env, eigenrays, model)
-    if debug:
-        print('[DEBUG] Model: '+model_name)
-    return model.run(env, eigenrays, debug)
+    return _run_model(model_name, model, env, eigenrays, debug, timeout, cancel)
+
+def compute_eigenray_map(env, tx_depth_ndx=0, receivers=None, model=None, debug=False, timeout=None, cancel=None):
+    """Compute eigenrays between a given transmitter and many receivers.
 
-def compute_rays(env, tx_depth_ndx=0, model=None, debug=False):
+    :param env: environment definition
+    :param tx_depth_ndx: transmitter depth index
+    :param receivers: list of (rx_depth_ndx, rx_range_ndx) receivers (None for all receivers)
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for each model run in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :param cancel: `threading.Event` that cancels the model runs when set (None for no cancellation)
+    :returns: eigenray paths, indexed by receiver depth index and receiver range index
+
+    Rather than running the model once per receiver, the eigenrays to all receivers
+    are computed together in one model run, and the arrivals to all receivers in a
+    second. Each eigenray is then attributed to the receivers that it arrives at, by
+    matching its angle of departure and number of surface and bottom bounces with the
+    arrivals. An eigenray that arrives at several receivers is listed once for each.
+    An arrival only matches an eigenray launched within half a beam spacing of it, and
+    arrivals without a matching eigenray are dropped. The beam spacing is computed from
+    `nbeams` in the environment or, if that is 0, from the number of beams that Bellhop
+    chooses automatically.
+
+    >>> import arlpy.uwapm as pm
+    >>> env = pm.create_env2d(rx_depth=[5, 10, 15], rx_range=[500, 1000])
+    >>> rays = pm.compute_eigenray_map(env)
+    >>> pm.plot_rays(rays.loc[(1, 0)], width=1000)
+    """
+    check_env2d(env)
+    env = _tx_env(env, tx_depth_ndx).copy()
+    rx_depth = _np.atleast_1d(env['rx_depth'])
+    rx_range = _np.atleast_1d(env['rx_range'])
+    if receivers is None:
+        rd_ndx = _np.arange(rx_depth.size)
+        rr_ndx = _np.arange(rx_range.size)
+    else:
+        receivers = _np.asarray(receivers, dtype=_np.int64).reshape(-1, 2)
+        rd_ndx = _np.unique(receivers[:,0])
+        rr_ndx = _np.unique(receivers[:,1])
+        env['rx_depth'] = rx_depth[rd_ndx] if rd_ndx.size > 1 else rx_depth[rd_ndx[0]]
+        env['rx_range'] = rx_range[rr_ndx] if rr_ndx.size > 1 else rx_range[rr_ndx[0]]
+    # both runs use the same model, so that the eigenrays and arrivals come from the same beam fan
+    (model_name, m) = _select_model(env, eigenrays, model)
+    eig = _run_model(model_name, m, env, eigenrays, debug, timeout, cancel)
+    arr = _run_model(model_name, m, env, arrivals, debug, timeout, cancel)
+    if eig is None or arr is None:
+        return None
+    # map receivers back to their indices in the original environment
+    arr = arr.assign(rx_depth_ndx=rd_ndx[arr.rx_depth_ndx.values], rx_range_ndx=rr_ndx[arr.rx_range_ndx.values])
+    if receivers is not None:
+        wanted = set(map(tuple, receivers.tolist()))
+        arr = arr[[(a, b) in wanted for a, b in zip(arr.rx_depth_ndx, arr.rx_range_ndx)]]
+    # match each arrival to the eigenray with the nearest angle of departure and the same bounces,
+    # if it was launched within half a beam spacing
+    nbeams = env.get('nbeams', 0)
+    if nbeams == 0:
+        nbeams = max(int(0.3*_np.max(env['rx_range'])*env['frequency']/1500), 300)
+    tolerance = 0.5*(env['max_angle']-env['min_angle'])/nbeams
+    ray_ndx = _np.full(len(arr), -1, dtype=_np.int64)
+    ray_bounces = eig.surface_bounces.values*65536 + eig.bottom_bounces.values
+    arr_bounces = arr.surface_bounces.values*65536 + arr.bottom_bounces.values
+    for b in _np.unique(arr_bounces):
+        cand = _np.nonzero(ray_bounces == b)[0]
+        if cand.size == 0:
+            continue
+        cand = cand[_np.argsort(eig.angle_of_departure.values[cand], kind='stable')]
+        ang = eig.angle_of_departure.values[cand]
+        sel = _np.nonzero(arr_bounces == b)[0]
+        a = arr.angle_of_departure.values[sel]
+        j = _np.searchsorted(ang, a)
+        lo = _np.clip(j-1, 0, ang.size-1)
+        hi = _np.clip(j, 0, ang.size-1)
+        nearest = _np.where(_np.abs(a-ang[lo]) <= _np.abs(a-ang[hi]), lo, hi)
+        ray_ndx[sel] = _np.where(_np.abs(a-ang[nearest]) <= tolerance, cand[nearest], -1)
+    valid = ray_ndx >= 0
+    arr = arr[valid]
+    ray_ndx = ray_ndx[valid]
+    return _pd.DataFrame({
+        'rx_depth_ndx': arr.rx_depth_ndx.values,
+        'rx_range_ndx': arr.rx_range_ndx.values,
+        'rx_depth': arr.rx_depth.values,
+        'rx_range': arr.rx_range.values,
+        'angle_of_departure': eig.angle_of_departure.values[ray_ndx],
+        'surface_bounces': eig.surface_bounces.values[ray_ndx],
+        'bottom_bounces': eig.bottom_bounces.values[ray_ndx],
+        'ray': eig.ray.values[ray_ndx]
+    }).set_index(['rx_depth_ndx', 'rx_range_ndx'])
+
+def compute_rays(env, tx_depth_ndx=0, model=None, debug=False, timeout=None, cancel=None):
     """Compute rays from a given transmitter.
 
     :param env: environment definition
     :param tx_depth_ndx: transmitter depth index
     :param model: propagation model to use (None to auto-select)
     :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for the model in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :param cancel: `threading.Event` that cancels the model run when set (None for no cancellation)
     :returns: ray paths
 
     >>> import arlpy.uwapm as pm
@@ -337,24 +649,40 @@ def compute_rays(env, tx_depth_ndx=0, model=None, debug=False):
     >>> pm.plot_rays(rays, width=1000)
     """
     check_env2d(env)
-    if _np.size(env['tx_depth']) > 1:
-        env = env.copy()
-        env['tx_depth'] = env['tx_depth'][tx_depth_ndx]
+    env = _tx_env(env, tx_depth_ndx)
     (model_name, model) = _select_model(env, rays, model)
-    if debug:
-        print('[DEBUG] Model: '+model_name)
-    return model.run(env, rays, debug)
+    return _run_model(model_name, model, env, rays, debug, timeout, cancel)
 
-def compute_transmission_loss(env, tx_depth_ndx=0, mode=coherent, model=None, debug=False):
+def compute_transmission_loss(env, tx_depth_ndx=0, mode=coherent, model=None, debug=False, complex64=False, out=None, timeout=None, cancel=None):
     """Compute transmission loss from a given transmitter to all receviers.
 
     :param env: environment definition
-    :param tx_depth_ndx: transmitter depth index
+    :param tx_depth_ndx: transmitter depth index (None for all transmitters)
     :param mode: coherent, incoherent or semicoherent
     :param model: propagation model to use (None to auto-select)
     :param debug: generate debug information for propagation model
+    :param complex64: True for single precision complex results, False for double precision
+    :param out: name of a .npy file to write results to (None to return results in memory)
+    :param timeout: maximum time to wait for the model in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :param cancel: `threading.Event` that cancels the model run when set (None for no cancellation)
     :returns: complex transmission loss at each receiver depth and range
 
+    If `tx_depth_ndx` is None, the transmission loss from all transmitters is computed
+    in a single model run, and the rows are indexed by transmitter depth and receiver depth.
+
+    Single precision results use half the memory, and are mapped directly from the
+    model output file without copying, which is useful for dense receiver grids.
+
+    Grids too large to hold in memory may be written to disk by specifying an `out`
+    file. The model output is then streamed into the file, and a
+    :class:`arlpy.uwapm.TransmissionLossFile` is returned to access it.
+
+    >>> import arlpy.uwapm as pm
+    >>> import numpy as np
+    >>> env = pm.create_env2d(rx_depth=np.arange(0, 25, 0.01), rx_range=np.arange(0, 100000, 10))
+    >>> tloss = pm.compute_transmission_loss(env, out='tloss.npy')
+    >>> pm.plot_transmission_loss(tloss, width=1000)
+
     >>> import arlpy.uwapm as pm
     >>> env = pm.create_env2d()
     >>> tloss = pm.compute_transmission_loss(env, mode=pm.incoherent)
@@ -363,37 +691,800 @@ def compute_transmission_loss(env, tx_depth_ndx=0, mode=coherent, model=None, de
     check_env2d(env)
     if mode not in [coherent, incoherent, semicoherent]:
         raise ValueError('Unknown transmission loss mode: '+mode)
-    if _np.size(env['tx_depth']) > 1:
-        env = env.copy()
-        env['tx_depth'] = env['tx_depth'][tx_depth_ndx]
+    env = _tx_env(env, tx_depth_ndx)
     (model_name, model) = _select_model(env, mode, model)
-    if debug:
-        print('[DEBUG] Model: '+model_name)
-    return model.run(env, mode, debug)
+    if out is None:
+        return _run_model(model_name, model, env, mode, debug, timeout, cancel, complex64=complex64)
+    return _run_model(model_name, model, env, mode, debug, timeout, cancel, complex64=complex64, out=out)
+
+def compute_arrivals_batch(envs, workers=None, model=None, debug=False, timeout=None, cancel=None):
+    """Compute arrivals for many environments concurrently.
+
+    :param envs: list of environment definitions
+    :param workers: maximum number of concurrent model runs (None to use number of CPUs)
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for each model run in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :param cancel: `threading.Event` that cancels all model runs when set (None for no cancellation)
+    :returns: arrivals for all environments, indexed by environment index
+
+    Each environment is modeled in its own propagation model process, with up to
+    `workers` processes running at the same time. The arrivals for all environments
+    are combined into a single table, with the environment index as the first level
+    of the row index. Environments for which the model fails to produce results, or
+    does not complete within the `timeout`, are omitted with a warning, so a single
+    runaway model run does not hold up the rest of the batch.
 
-def arrivals_to_impulse_response(arrivals, fs, abs_time=False):
+    >>> import arlpy.uwapm as pm
+    >>> envs = [pm.create_env2d(rx_range=r) for r in [500, 1000, 2000]]
+    >>> arrivals = pm.compute_arrivals_batch(envs, workers=3)
+    >>> pm.plot_arrivals(arrivals.loc[1])
+    """
+    return _compute_batch(compute_arrivals, envs, workers, model=model, debug=debug, timeout=timeout, cancel=cancel)
+
+def compute_rays_batch(envs, tx_depth_ndx=0, workers=None, model=None, debug=False, timeout=None, cancel=None):
+    """Compute rays for many environments concurrently.
+
+    :param envs: list of environment definitions
+    :param tx_depth_ndx: transmitter depth index
+    :param workers: maximum number of concurrent model runs (None to use number of CPUs)
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for each model run in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :param cancel: `threading.Event` that cancels all model runs when set (None for no cancellation)
+    :returns: ray paths for all environments, indexed by environment index
+
+    See :func:`arlpy.uwapm.compute_arrivals_batch` for details on how environments
+    are run and results combined.
+
+    >>> import arlpy.uwapm as pm
+    >>> envs = [pm.create_env2d(tx_depth=d) for d in [5, 10, 15]]
+    >>> rays = pm.compute_rays_batch(envs)
+    >>> pm.plot_rays(rays.loc[2], width=1000)
+    """
+    return _compute_batch(compute_rays, envs, workers, tx_depth_ndx=tx_depth_ndx, model=model, debug=debug, timeout=timeout, cancel=cancel)
+
+def compute_transmission_loss_batch(envs, tx_depth_ndx=0, mode=coherent, workers=None, model=None, debug=False, complex64=False, timeout=None, cancel=None):
+    """Compute transmission loss for many environments concurrently.
+
+    :param envs: list of environment definitions
+    :param tx_depth_ndx: transmitter depth index
+    :param mode: coherent, incoherent or semicoherent
+    :param workers: maximum number of concurrent model runs (None to use number of CPUs)
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param complex64: True for single precision complex results, False for double precision
+    :param timeout: maximum time to wait for each model run in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :param cancel: `threading.Event` that cancels all model runs when set (None for no cancellation)
+    :returns: complex transmission loss for all environments, indexed by environment index
+
+    See :func:`arlpy.uwapm.compute_arrivals_batch` for details on how environments
+    are run and results combined.
+
+    >>> import arlpy.uwapm as pm
+    >>> import numpy as np
+    >>> envs = [pm.create_env2d(frequency=f, rx_depth=np.arange(0, 25), rx_range=np.arange(0, 1000)) for f in [5000, 10000]]
+    >>> tloss = pm.compute_transmission_loss_batch(envs, mode=pm.incoherent)
+    >>> pm.plot_transmission_loss(tloss.loc[0], width=1000)
+    """
+    if mode not in [coherent, incoherent, semicoherent]:
+        raise ValueError('Unknown transmission loss mode: '+mode)
+    return _compute_batch(compute_transmission_loss, envs, workers, tx_depth_ndx=tx_depth_ndx, mode=mode, model=model, debug=debug, complex64=complex64, timeout=timeout, cancel=cancel)
+
+def sweep(env, task, workers=None, model=None, debug=False, timeout=None, cancel=None, **grids):
+    """Compute model results over a grid of environment parameters.
+
+    :param env: base environment definition
+    :param task: `arrivals`, `eigenrays`, `rays`, `coherent`, `incoherent` or `semicoherent`
+    :param workers: maximum number of concurrent model runs (None to use number of CPUs)
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for each model run in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :param cancel: `threading.Event` that cancels all model runs when set (None for no cancellation)
+    :param grids: environment keys to sweep, each with a list of values
+    :returns: results for all parameter combinations, indexed by the swept parameters
+
+    The environment is modeled for every combination of the swept parameter values,
+    with duplicate values ignored. The model runs are made concurrently, as in
+    :func:`arlpy.uwapm.compute_arrivals_batch`. The results are combined into a single
+    table, with one level of the row index per swept parameter. Parameters with any
+    value that is an array (such as `soundspeed` profiles) are indexed by the position
+    of the value in the list of unique values. Array values may be given as nested lists,
+    and are converted as in :func:`arlpy.uwapm.create_env2d`. Eigenrays and rays are computed for the first transmitter and receiver.
+
+    >>> import arlpy.uwapm as pm
+    >>> env = pm.create_env2d()
+    >>> arrivals = pm.sweep(env, pm.arrivals, frequency=[5000, 10000], tx_depth=[5, 10, 15])
+    >>> arrivals.loc[(10000, 5)]
+    """
+    if task == arrivals:
+        func, kwargs = compute_arrivals, {}
+    elif task == eigenrays:
+        func, kwargs = compute_eigenrays, {}
+    elif task == rays:
+        func, kwargs = compute_rays, {}
+    elif task in [coherent, incoherent, semicoherent]:
+        func, kwargs = compute_transmission_loss, {'mode': task}
+    else:
+        raise ValueError('Unknown task: '+str(task))
+    names = list(grids.keys())
+    values = []
+    labels = []
+    for k in names:
+        if k not in env:
+            raise KeyError('Unknown environment key: '+k)
+        # array values are converted as in create_env2d
+        v, l = _unique_values([_np.asarray(x, dtype=_np.float64) if _np.size(x) > 1 else x for x in grids[k]])
+        values.append(v)
+        labels.append(l)
+    envs = []
+    keys = []
+    for ndx in _itertools.product(*[range(len(v)) for v in values]):
+        e = dict(env)
+        for k, v, j in zip(names, values, ndx):
+            e[k] = v[j]
+        envs.append(e)
+        keys.append(tuple(l[j] for l, j in zip(labels, ndx)))
+    if len(names) == 1:
+        keys = [k[0] for k in keys]
+    results = _run_batch(func, envs, workers, model=model, debug=debug, timeout=timeout, cancel=cancel, **kwargs)
+    return _combine_results(results, keys, names)
+
+class QueryPlanner:
+    """Coalesce arrival queries for individual receivers into a single model run.
+
+    :param env: environment definition (transmitter and receiver locations are ignored)
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for the model in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+
+    Queries are submitted for a transmitter depth, receiver depth and receiver range,
+    and held until the planner is flushed. On flush, the transmitter depths, receiver
+    depths and receiver ranges of all pending queries are merged into a single
+    environment, the model is run once, and the arrivals are split back to each query.
+    Each query receives the arrivals that :func:`arlpy.uwapm.compute_arrivals` would
+    return for an environment with only that transmitter and receiver. If used as a
+    context manager, the planner is flushed on exit.
+
+    >>> import arlpy.uwapm as pm
+    >>> env = pm.create_env2d()
+    >>> with pm.QueryPlanner(env) as planner:
+    >>>     q1 = planner.submit(5, 10, 1000)
+    >>>     q2 = planner.submit(5, 20, 1500)
+    >>> pm.plot_arrivals(q2.result())
+    """
+
+    def __init__(self, env, model=None, debug=False, timeout=None):
+        self.env = env
+        self.model = model
+        self.debug = debug
+        self.timeout = timeout
+        self._pending = []
+        self._lock = _threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, tx_depth, rx_depth, rx_range):
+        """Submit an arrival query.
+
+        :param tx_depth: transmitter depth (m)
+        :param rx_depth: receiver depth (m)
+        :param rx_range: receiver range (m)
+        :returns: `concurrent.futures.Future` that holds the arrivals once the planner is flushed
+        """
+        f = _futures.Future()
+        with self._lock:
+            self._pending.append((float(tx_depth), float(rx_depth), float(rx_range), f))
+        return f
+
+    def flush(self):
+        """Run the model for all pending queries, and complete their futures.
+
+        :returns: number of queries completed
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+        # skip queries that were cancelled by the caller while pending
+        pending = [p for p in pending if p[3].set_running_or_notify_cancel()]
+        if len(pending) == 0:
+            return 0
+        q = _np.array([p[:3] for p in pending])
+        tx_depth, tx_ndx = _np.unique(q[:,0], return_inverse=True)
+        rx_depth, rx_depth_ndx = _np.unique(q[:,1], return_inverse=True)
+        rx_range, rx_range_ndx = _np.unique(q[:,2], return_inverse=True)
+        env = dict(self.env)
+        env['tx_depth'] = tx_depth[0] if tx_depth.size == 1 else tx_depth
+        env['rx_depth'] = rx_depth[0] if rx_depth.size == 1 else rx_depth
+        env['rx_range'] = rx_range[0] if rx_range.size == 1 else rx_range
+        try:
+            arr = compute_arrivals(env, model=self.model, debug=self.debug, timeout=self.timeout)
+            if arr is None:
+                raise RuntimeError('Propagation model did not produce any arrivals')
+        except Exception as e:
+            for p in pending:
+                p[3].set_exception(e)
+            return len(pending)
+        # sort arrivals by receiver, so that each query's arrivals are a contiguous block
+        key = (arr.tx_depth_ndx.values*rx_depth.size + arr.rx_depth_ndx.values)*rx_range.size + arr.rx_range_ndx.values
+        order = _np.argsort(key, kind='stable')
+        key = key[order]
+        arr = arr.iloc[order]
+        qkey = (tx_ndx*rx_depth.size + rx_depth_ndx)*rx_range.size + rx_range_ndx
+        start = _np.searchsorted(key, qkey, side='left')
+        end = _np.searchsorted(key, qkey, side='right')
+        for p, j, k in zip(pending, start, end):
+            a = arr.iloc[j:k].copy()
+            a.index = _np.arange(1, len(a)+1)
+            a['tx_depth_ndx'] = 0
+            a['rx_depth_ndx'] = 0
+            a['rx_range_ndx'] = 0
+            p[3].set_result(a)
+        return len(pending)
+
+def set_async_workers(workers):
+    """Set the maximum number of concurrent model runs through the asyncio API.
+
+    :param workers: maximum number of concurrent model runs per event loop
+
+    By default, the number of concurrent model runs is limited to the number of CPUs.
+    Further queries wait for a model run to complete before starting.
+
+    >>> import arlpy.uwapm as pm
+    >>> pm.set_async_workers(16)
+    """
+    global _async_workers
+    _async_workers = workers
+    _async_semaphores.clear()
+
+async def compute_arrivals_async(env, model=None, debug=False, timeout=None):
+    """Compute arrivals between each transmitter and receiver, without blocking the event loop.
+
+    :param env: environment definition
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for the model in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :returns: arrival times and coefficients for all transmitter-receiver combinations
+
+    This is a coroutine version of :func:`arlpy.uwapm.compute_arrivals` for use with
+    `asyncio`. The propagation model is run as an asyncio subprocess, and model input
+    and output files are written and parsed in the default executor, so many queries
+    may be in flight at the same time. The number of concurrent model runs is limited
+    by :func:`arlpy.uwapm.set_async_workers`. Cancelling the coroutine terminates the
+    model run.
+
+    >>> import asyncio
+    >>> import arlpy.uwapm as pm
+    >>> async def main():
+    >>>     envs = [pm.create_env2d(rx_range=r) for r in [500, 1000, 2000]]
+    >>>     return await asyncio.gather(*[pm.compute_arrivals_async(env) for env in envs])
+    >>> arrivals = asyncio.get_event_loop().run_until_complete(main())
+    """
+    check_env2d(env)
+    return await _compute_async(env, arrivals, model, debug, timeout)
+
+async def compute_eigenrays_async(env, tx_depth_ndx=0, rx_depth_ndx=0, rx_range_ndx=0, model=None, debug=False, timeout=None):
+    """Compute eigenrays between a given transmitter and receiver, without blocking the event loop.
+
+    :param env: environment definition
+    :param tx_depth_ndx: transmitter depth index
+    :param rx_depth_ndx: receiver depth index
+    :param rx_range_ndx: receiver range index
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for the model in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :returns: eigenrays paths
+
+    This is a coroutine version of :func:`arlpy.uwapm.compute_eigenrays`. See
+    :func:`arlpy.uwapm.compute_arrivals_async` for details.
+
+    >>> import asyncio
+    >>> import arlpy.uwapm as pm
+    >>> env = pm.create_env2d()
+    >>> rays = asyncio.get_event_loop().run_until_complete(pm.compute_eigenrays_async(env))
+    """
+    check_env2d(env)
+    env = _eigenray_env(env, tx_depth_ndx, rx_depth_ndx, rx_range_ndx)
+    return await _compute_async(env, eigenrays, model, debug, timeout)
+
+async def compute_rays_async(env, tx_depth_ndx=0, model=None, debug=False, timeout=None):
+    """Compute rays from a given transmitter, without blocking the event loop.
+
+    :param env: environment definition
+    :param tx_depth_ndx: transmitter depth index
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param timeout: maximum time to wait for the model in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :returns: ray paths
+
+    This is a coroutine version of :func:`arlpy.uwapm.compute_rays`. See
+    :func:`arlpy.uwapm.compute_arrivals_async` for details.
+
+    >>> import asyncio
+    >>> import arlpy.uwapm as pm
+    >>> env = pm.create_env2d()
+    >>> rays = asyncio.get_event_loop().run_until_complete(pm.compute_rays_async(env))
+    """
+    check_env2d(env)
+    env = _tx_env(env, tx_depth_ndx)
+    return await _compute_async(env, rays, model, debug, timeout)
+
+async def compute_transmission_loss_async(env, tx_depth_ndx=0, mode=coherent, model=None, debug=False, complex64=False, timeout=None):
+    """Compute transmission loss from a given transmitter to all receviers, without blocking the event loop.
+
+    :param env: environment definition
+    :param tx_depth_ndx: transmitter depth index (None for all transmitters)
+    :param mode: coherent, incoherent or semicoherent
+    :param model: propagation model to use (None to auto-select)
+    :param debug: generate debug information for propagation model
+    :param complex64: True for single precision complex results, False for double precision
+    :param timeout: maximum time to wait for the model in seconds (None to use default from :func:`arlpy.uwapm.set_timeout`)
+    :returns: complex transmission loss at each receiver depth and range
+
+    This is a coroutine version of :func:`arlpy.uwapm.compute_transmission_loss`. See
+    :func:`arlpy.uwapm.compute_arrivals_async` for details.
+
+    >>> import asyncio
+    >>> import arlpy.uwapm as pm
+    >>> env = pm.create_env2d()
+    >>> tloss = asyncio.get_event_loop().run_until_complete(pm.compute_transmission_loss_async(env, mode=pm.incoherent))
+    """
+    check_env2d(env)
+    if mode not in [coherent, incoherent, semicoherent]:
+        raise ValueError('Unknown transmission loss mode: '+mode)
+    env = _tx_env(env, tx_depth_ndx)
+    return await _compute_async(env, mode, model, debug, timeout, complex64=complex64)
+
+class Arrivals:
+    """Compact arrivals, indexed by receiver.
+
+    :param arrivals: arrivals table, as returned by :func:`arlpy.uwapm.compute_arrivals`
+    :param compact: True to store values with reduced precision, False to store them as is
+
+    The arrivals are held in one array per column, sorted by transmitter and receiver,
+    with the offset of each receiver's arrivals precomputed, so that the arrivals for a
+    receiver are found in constant time. With `compact` set to True, indices and bounce
+    counts are stored as int16 (or int32 if needed), angles as float32, and amplitudes as
+    complex64, while arrival times are kept in double precision. With `compact` set to
+    False, :meth:`to_dataframe` returns a table identical to the one the arrivals were
+    created from.
+
+    >>> import arlpy.uwapm as pm
+    >>> env = pm.create_env2d(rx_depth=[5, 10, 15], rx_range=[500, 1000])
+    >>> arrivals = pm.Arrivals(pm.compute_arrivals(env))
+    >>> arrivals.for_receiver(0, 2, 1)
+    """
+
+    columns = ['tx_depth_ndx', 'rx_depth_ndx', 'rx_range_ndx', 'tx_depth', 'rx_depth', 'rx_range', 'arrival_number',
+               'arrival_amplitude', 'time_of_arrival', 'angle_of_departure', 'angle_of_arrival', 'surface_bounces', 'bottom_bounces']
+
+    def __init__(self, arrivals, compact=True):
+        ndx = [arrivals[c].values.astype(_np.int64) for c in self.columns[:3]]
+        self.shape = tuple(int(_np.max(x))+1 if len(x) > 0 else 0 for x in ndx)
+        key = _np.ravel_multi_index(ndx, self.shape) if len(arrivals) > 0 else _np.zeros(0, dtype=_np.int64)
+        order = _np.argsort(key, kind='stable')
+        self._order = None if _np.all(order[1:] > order[:-1]) else _np.argsort(order)
+        counts = _np.bincount(key, minlength=int(_np.prod(self.shape)))
+        self.offsets = _np.concatenate(([0], _np.cumsum(counts)))
+        # grid axes, with NaN for receivers without arrivals
+        self.tx_depth, self.rx_depth, self.rx_range = [_np.full(n, _np.nan) for n in self.shape]
+        for axis, c, j in zip([self.tx_depth, self.rx_depth, self.rx_range], ['tx_depth', 'rx_depth', 'rx_range'], ndx):
+            axis[j] = arrivals[c].values
+        self.index = arrivals.index.values[order]
+        self._dtypes = {c: arrivals[c].dtype for c in self.columns}
+        self.data = {}
+        for c in self.columns:
+            if c in ['tx_depth', 'rx_depth', 'rx_range']:
+                continue
+            v = arrivals[c].values[order]
+            if compact and c != 'time_of_arrival':
+                v = _compact_array(v, True)
+            self.data[c] = v
+
+    def __len__(self):
+        return len(self.index)
+
+    def _slice(self, tx_depth_ndx, rx_depth_ndx, rx_range_ndx):
+        if not (0 <= tx_depth_ndx < self.shape[0] and 0 <= rx_depth_ndx < self.shape[1] and 0 <= rx_range_ndx < self.shape[2]):
+            return slice(0, 0)
+        j = (tx_depth_ndx*self.shape[1] + rx_depth_ndx)*self.shape[2] + rx_range_ndx
+        return slice(self.offsets[j], self.offsets[j+1])
+
+    def for_receiver(self, tx_depth_ndx, rx_depth_ndx, rx_range_ndx):
+        """Get the arrivals between a given transmitter and receiver.
+
+        :param tx_depth_ndx: transmitter depth index
+        :param rx_depth_ndx: receiver depth index
+        :param rx_range_ndx: receiver range index
+        :returns: arrivals table for the transmitter and receiver
+        """
+        return self._frame(self._slice(tx_depth_ndx, rx_depth_ndx, rx_range_ndx))
+
+    def to_dataframe(self):
+        """Convert to an arrivals table, as returned by :func:`arlpy.uwapm.compute_arrivals`."""
+        df = self._frame(slice(None))
+        if self._order is not None:
+            df = df.iloc[self._order]
+        return df
+
+    @classmethod
+    def from_dataframe(cls, arrivals, compact=True):
+        """Create compact arrivals from an arrivals table.
+
+        :param arrivals: arrivals table, as returned by :func:`arlpy.uwapm.compute_arrivals`
+        :param compact: True to store values with reduced precision, False to store them as is
+        :returns: compact arrivals
+        """
+        return cls(arrivals, compact)
+
+    def _frame(self, s):
+        data = {}
+        for c in self.columns:
+            if c in self.data:
+                data[c] = self.data[c][s].astype(self._dtypes[c], copy=False)
+        for c, axis, j in zip(['tx_depth', 'rx_depth', 'rx_range'], [self.tx_depth, self.rx_depth, self.rx_range], ['tx_depth_ndx', 'rx_depth_ndx', 'rx_range_ndx']):
+            data[c] = axis[self.data[j][s]].astype(self._dtypes[c], copy=False)
+        return _pd.DataFrame({c: data[c] for c in self.columns}, index=self.index[s])
+
+def arrivals_to_impulse_response(arrivals, fs, abs_time=False, width=0):
     """Convert arrival times and coefficients to an impulse response.
 
     :param arrivals: arrivals times (s) and coefficients
     :param fs: sampling rate (Hz)
     :param abs_time: absolute time (True) or relative time (False)
+    :param width: half-width of band-limited interpolation filter in samples (0 to use nearest sample)
     :returns: impulse response
 
     If `abs_time` is set to True, the impulse response is placed such that
     the zero time corresponds to the time of transmission of signal.
 
+    Arrivals that fall in the same sample are summed. By default, each arrival is
+    placed at its nearest sample. If a `width` is specified, each arrival is instead
+    represented by `2*width` taps of a windowed sinc filter, preserving its fractional
+    delay. In this case, a relative time impulse response is delayed by `width` samples
+    to accommodate the filter.
+
     >>> import arlpy.uwapm as pm
     >>> env = pm.create_env2d()
     >>> arrivals = pm.compute_arrivals(env)
     >>> ir = pm.arrivals_to_impulse_response(arrivals, fs=192000)
     """
-    t0 = 0 if abs_time else min(arrivals.time_of_arrival)
-    irlen = int(_np.ceil((max(arrivals.time_of_arrival)-t0)*fs))+1
-    ir = _np.zeros(irlen, dtype=_np.complex)
-    for _, row in arrivals.iterrows():
-        ndx = int(_np.round((row.time_of_arrival.real-t0)*fs))
-        ir[ndx] = row.arrival_amplitude
-    return ir
+    t = _np.real(arrivals.time_of_arrival.values)
+    t0 = 0 if abs_time else _np.min(t)-width/fs
+    return _impulse_responses(_np.zeros(len(t), dtype=_np.int64), 1, t, arrivals.arrival_amplitude.values, fs, t0, width)[0]
+
+def arrivals_to_impulse_responses(arrivals, fs, abs_time=False, width=0):
+    """Convert arrival times and coefficients to impulse responses for all receivers.
+
+    :param arrivals: arrivals times (s) and coefficients
+    :param fs: sampling rate (Hz)
+    :param abs_time: absolute time (True) or relative time (False)
+    :param width: half-width of band-limited interpolation filter in samples (0 to use nearest sample)
+    :returns: impulse responses, one row per transmitter and receiver combination
+
+    This function computes the impulse responses for every combination of transmitter
+    depth, receiver depth and receiver range in the arrivals, in a single call. The rows
+    of the result are indexed by `tx_depth_ndx`, `rx_depth_ndx` and `rx_range_ndx`, and
+    the columns are samples on a time axis common to all impulse responses. If `abs_time`
+    is set to True, the zero time corresponds to the time of transmission of signal,
+    otherwise it corresponds to the earliest arrival across all receivers.
+
+    See :func:`arlpy.uwapm.arrivals_to_impulse_response` for details on the `width` option.
+
+    >>> import arlpy.uwapm as pm
+    >>> import numpy as np
+    >>> env = pm.create_env2d(rx_depth=[5, 10, 15], rx_range=[500, 1000])
+    >>> arrivals = pm.compute_arrivals(env)
+    >>> ir = pm.arrivals_to_impulse_responses(arrivals, fs=192000)
+    >>> ir.loc[(0, 1, 1)]
+    """
+    keys = arrivals[['tx_depth_ndx', 'rx_depth_ndx', 'rx_range_ndx']].values
+    keys, rx = _np.unique(keys, axis=0, return_inverse=True)
+    t = _np.real(arrivals.time_of_arrival.values)
+    t0 = 0 if abs_time else _np.min(t)-width/fs
+    ir = _impulse_responses(rx.ravel(), len(keys), t, arrivals.arrival_amplitude.values, fs, t0, width)
+    index = _pd.MultiIndex.from_arrays(keys.T, names=['tx_depth_ndx', 'rx_depth_ndx', 'rx_range_ndx'])
+    return _pd.DataFrame(ir, index=index)
+
+def arrivals_to_frequency_response(arrivals, frequency, mode=coherent):
+    """Compute the frequency response at all receivers from arrivals.
+
+    :param arrivals: arrivals times (s) and coefficients
+    :param frequency: frequency or array of frequencies (Hz)
+    :param mode: coherent or incoherent
+    :returns: complex (coherent) or real (incoherent) pressure, one row per transmitter and receiver combination
+
+    The field at each receiver is synthesized from the arrivals for every frequency,
+    so a broadband transmission loss or channel transfer function only needs a single
+    run of the propagation model. In coherent mode, the arrivals are summed with the
+    phase delay at each frequency, relative to the time of transmission. In incoherent
+    mode, the arrival intensities are summed. The arrival amplitudes are taken to be
+    those at the frequency the arrivals were computed for. The rows of the result are
+    indexed by `tx_depth_ndx`, `rx_depth_ndx` and `rx_range_ndx`, and the columns are
+    the frequencies.
+
+    >>> import arlpy.uwapm as pm
+    >>> import numpy as np
+    >>> env = pm.create_env2d(rx_depth=[5, 10, 15], rx_range=[500, 1000])
+    >>> arrivals = pm.compute_arrivals(env)
+    >>> p = pm.arrivals_to_frequency_response(arrivals, np.arange(20000, 30000, 10))
+    >>> tloss = 20*np.log10(np.abs(p))
+    """
+    if mode not in [coherent, incoherent]:
+        raise ValueError('Unknown mode: '+str(mode))
+    frequency = _np.atleast_1d(_np.asarray(frequency, dtype=_np.float64))
+    keys = arrivals[['tx_depth_ndx', 'rx_depth_ndx', 'rx_range_ndx']].values
+    keys, rx = _np.unique(keys, axis=0, return_inverse=True)
+    rx = rx.ravel()
+    amp = arrivals.arrival_amplitude.values.astype(_np.complex128)
+    index = _pd.MultiIndex.from_arrays(keys.T, names=['tx_depth_ndx', 'rx_depth_ndx', 'rx_range_ndx'])
+    if mode == incoherent:
+        p = _np.sqrt(_np.bincount(rx, weights=_np.abs(amp)**2, minlength=len(keys)))
+        return _pd.DataFrame(_np.repeat(p[:,None], len(frequency), axis=1), index=index, columns=frequency)
+    t = _np.real(arrivals.time_of_arrival.values)
+    # sum arrivals per receiver as a sparse matrix product, over blocks of frequencies to bound memory
+    m = _sparse.csr_matrix((amp, (rx, _np.arange(len(rx)))), shape=(len(keys), len(rx)))
+    p = _np.empty((len(keys), len(frequency)), dtype=_np.complex128)
+    step = max(1, 4*1024*1024//max(len(t), 1))
+    df = _np.diff(frequency)
+    run = min(256, len(frequency))
+    if len(frequency) > 2 and _np.allclose(df, df[0]) and step >= run:
+        # on a uniform frequency grid, each phase term is the previous one rotated by a fixed step,
+        # which is much cheaper than evaluating the complex exponential (re-seeded every `run`
+        # frequencies to bound the accumulated rounding error, with blocks of whole runs)
+        step = step//run*run
+        rot = _np.exp(-2j*_np.pi*df[0]*t)
+        for j in range(0, len(frequency), step):
+            f = frequency[j:j+step]
+            e = _np.empty((len(t), (len(f)+run-1)//run, run), dtype=_np.complex128)
+            e[:,:,0] = _np.exp(-2j*_np.pi*_np.outer(t, f[::run]))
+            e[:,:,1:] = rot[:,None,None]
+            _np.cumprod(e, axis=2, out=e)
+            p[:,j:j+step] = m @ e.reshape(len(t), -1)[:,:len(f)]
+    else:
+        for j in range(0, len(frequency), step):
+            p[:,j:j+step] = m @ _np.exp(-2j*_np.pi*_np.outer(t, frequency[j:j+step]))
+    return _pd.DataFrame(p, index=index, columns=frequency)
+
+def simulate_channel(x, arrivals, fs, fc=None, abs_time=False, width=0, nfft=None):
+    """Simulate the signals received at all receivers for a given transmit signal.
+
+    :param x: transmit signal
+    :param arrivals: arrivals times (s) and coefficients
+    :param fs: sampling rate (Hz)
+    :param fc: carrier frequency for baseband signals (Hz), or None for passband signals
+    :param abs_time: absolute time (True) or relative time (False)
+    :param width: half-width of band-limited interpolation filter in samples (0 to use nearest sample)
+    :param nfft: FFT length for block convolution (None to auto-select)
+    :returns: received signals, one row per transmitter and receiver combination
+
+    The transmit signal is convolved with the impulse response for every combination of
+    transmitter depth, receiver depth and receiver range in the arrivals, using FFT-based
+    overlap-add convolution. Each block of the transmit signal is transformed once and
+    shared across all receivers. The rows of the result are indexed as in
+    :func:`arlpy.uwapm.arrivals_to_impulse_responses`, and all received signals share a
+    common time axis.
+
+    If `fc` is None, `x` is taken to be a real passband signal and the received signals
+    are real passband signals. If `fc` is specified, `x` is taken to be a complex baseband
+    signal (as generated by :func:`arlpy.signal.pb2bb`) for a carrier frequency `fc`, and
+    the received signals are complex baseband signals that may be converted to passband
+    using :func:`arlpy.signal.bb2pb`. Simulating in baseband is much cheaper than in
+    passband, as baseband signals may be sampled at a lower rate.
+
+    >>> import arlpy.uwapm as pm
+    >>> import arlpy.signal as asig
+    >>> import numpy as np
+    >>> env = pm.create_env2d(rx_depth=[5, 10, 15], rx_range=[500, 1000])
+    >>> arrivals = pm.compute_arrivals(env)
+    >>> x = asig.cw(25000, 0.01, 192000)
+    >>> y = pm.simulate_channel(x, arrivals, fs=192000)
+    >>> xbb = np.exp(2j*np.pi*np.random.randint(4, size=480)/4)
+    >>> ybb = pm.simulate_channel(xbb, arrivals, fs=24000, fc=25000)
+    >>> ypb = asig.bb2pb(ybb.loc[(0, 1, 1)], 24000, 25000, 192000)
+    """
+    if fc is None:
+        x = _np.asarray(x)
+    else:
+        x = _np.asarray(x, dtype=_np.complex128)
+        arrivals = arrivals.copy()
+        arrivals['arrival_amplitude'] = arrivals.arrival_amplitude * _np.exp(-2j*_np.pi*fc*_np.real(arrivals.time_of_arrival))
+    ir = arrivals_to_impulse_responses(arrivals, fs, abs_time, width)
+    h = ir.values
+    m = h.shape[1]
+    ylen = len(x)+m-1
+    if nfft is None:
+        nfft = int(2**_np.ceil(_np.log2(min(8*m, ylen))))
+    if nfft < m:
+        raise ValueError('nfft must be at least as long as the impulse response: '+str(m))
+    blen = nfft-m+1
+    if fc is None and _np.any(_np.imag(h) != 0):
+        # phase shifts of passband arrivals are applied to the analytic signal
+        x = _sp.hilbert(x)
+    if _np.iscomplexobj(x):
+        H = _np.fft.fft(h, nfft, axis=1)
+        y = _np.zeros((h.shape[0], ylen), dtype=_np.complex128)
+    else:
+        H = _np.fft.rfft(_np.real(h), nfft, axis=1)
+        y = _np.zeros((h.shape[0], ylen))
+    for j in range(0, len(x), blen):
+        if _np.iscomplexobj(x):
+            yb = _np.fft.ifft(_np.fft.fft(x[j:j+blen], nfft)*H, nfft, axis=1)
+        else:
+            yb = _np.fft.irfft(_np.fft.rfft(x[j:j+blen], nfft)*H, nfft, axis=1)
+        n = min(nfft, ylen-j)
+        y[:,j:j+n] += yb[:,:n]
+    if fc is None:
+        y = _np.real(y)
+    return _pd.DataFrame(y, index=ir.index)
+
+def track_arrivals(arrivals, track, tx_depth_ndx=0, env=None, frequency=None, c=1500.0):
+    """Interpolate arrivals computed on a grid of receivers along a receiver track.
+
+    :param arrivals: arrivals computed for a grid of receiver depths and ranges
+    :param track: receiver track as an Nx3 array or table of (time, rx_depth, rx_range)
+    :param tx_depth_ndx: transmitter depth index
+    :param env: environment the arrivals were computed for (None to infer the receiver grid from the arrivals)
+    :param frequency: frequency to compute Doppler shifts for (Hz), or None
+    :param c: nominal sound speed for computing radial speeds (m/s)
+    :returns: arrivals for each path at each track point
+
+    Each propagation path is identified by its number of surface and bottom bounces
+    and the direction (up or down) in which it leaves the transmitter, and the strongest
+    arrival of each path at each receiver on the grid is used. The delay and amplitude
+    of each path are bilinearly interpolated in depth and range to the receiver positions
+    on the track, which are clamped to the grid. A path is present at a track point if it
+    arrives at any of the surrounding grid receivers. The rate of change of delay gives
+    the radial speed of each path (positive when closing), and, if `frequency` is given,
+    its Doppler-shifted frequency using :func:`arlpy.uwa.doppler`.
+
+    >>> import arlpy.uwapm as pm
+    >>> import numpy as np
+    >>> env = pm.create_env2d(rx_depth=np.arange(0, 25, 1), rx_range=np.arange(900, 1100, 10))
+    >>> arrivals = pm.compute_arrivals(env)
+    >>> t = np.arange(0, 60, 0.1)
+    >>> paths = pm.track_arrivals(arrivals, np.column_stack((t, 10+np.sin(t), 950+2*t)), env=env, frequency=25000)
+    """
+    times, keys, tau, amp, present, points = _track_paths(arrivals, track, tx_depth_ndx, env)
+    with _np.errstate(invalid='ignore', divide='ignore'):
+        speed = -c*_np.gradient(tau, times, axis=1) if len(times) > 1 else _np.full(tau.shape, _np.nan)
+    k, n = _np.nonzero(present.T)[::-1]
+    df = _pd.DataFrame({
+        'track_ndx': n,
+        'time': times[n],
+        'rx_depth': points[n,0],
+        'rx_range': points[n,1],
+        'path_ndx': k,
+        'surface_bounces': keys[k,0],
+        'bottom_bounces': keys[k,1],
+        'time_of_arrival': tau[k,n],
+        'arrival_amplitude': amp[k,n],
+        'radial_speed': speed[k,n]
+    })
+    if frequency is not None:
+        df['doppler_frequency'] = _uwa.doppler(df.radial_speed.values, frequency, c)
+    return df
+
+class MovingChannel:
+    """Time-varying channel for a receiver moving along a track.
+
+    :param arrivals: arrivals computed for a grid of receiver depths and ranges
+    :param track: receiver track as an Nx3 array or table of (time, rx_depth, rx_range)
+    :param fs: sampling rate (Hz)
+    :param fc: carrier frequency for baseband signals (Hz), or None for passband signals
+    :param abs_time: absolute time (True) or relative time (False)
+    :param width: half-width of band-limited interpolation filter in samples (0 to use nearest sample)
+    :param tx_depth_ndx: transmitter depth index
+    :param env: environment the arrivals were computed for (None to infer the receiver grid from the arrivals)
+
+    The delay and amplitude of each propagation path are interpolated along the track
+    (see :func:`arlpy.uwapm.track_arrivals`), and then linearly in time between track
+    points for every sample. Each path delays the transmit signal by its time-varying
+    delay, which compresses or dilates the signal, and so produces the Doppler shift
+    for the motion of the receiver. Baseband signals are also rotated by the carrier
+    phase of the time-varying delay.
+
+    The channel is applied to the transmit signal in blocks with :meth:`apply`, which
+    keeps the state needed to continue with the next block, so arbitrarily long signals
+    can be streamed through it. The first sample of the transmit signal is sent at the
+    time of the first track point. Each output sample corresponds to the input sample
+    with the same index, received `delay_offset` seconds later. With `abs_time` set to
+    False, `delay_offset` is just smaller than the earliest arrival along the track,
+    otherwise it is zero. Passband and baseband signals are handled as in
+    :func:`arlpy.uwapm.simulate_channel`.
+
+    >>> import arlpy.uwapm as pm
+    >>> import arlpy.signal as asig
+    >>> import numpy as np
+    >>> env = pm.create_env2d(rx_depth=np.arange(0, 25, 1), rx_range=np.arange(900, 1100, 10))
+    >>> arrivals = pm.compute_arrivals(env)
+    >>> t = np.arange(0, 60, 0.1)
+    >>> ch = pm.MovingChannel(arrivals, np.column_stack((t, 10+np.sin(t), 950+2*t)), fs=24000, fc=25000, env=env)
+    >>> for j in range(60):
+    >>>     y = ch.apply(np.exp(2j*np.pi*np.random.randint(4, size=24000)/4))
+    """
+
+    def __init__(self, arrivals, track, fs, fc=None, abs_time=False, width=4, tx_depth_ndx=0, env=None):
+        self.fs = fs
+        self.fc = fc
+        self.width = width
+        times, keys, tau, amp, present, points = _track_paths(arrivals, track, tx_depth_ndx, env)
+        # fill in delays of paths at track points where they are absent, so they can be interpolated in time
+        ndx = _np.nonzero(_np.any(present, axis=1))[0]
+        for k in ndx:
+            p = present[k]
+            tau[k,~p] = _np.interp(times[~p], times[p], tau[k,p])
+        self.times = times
+        self.keys = keys[ndx]
+        self._tau = tau[ndx]
+        self._amp = amp[ndx]
+        # passband arrivals with phase shifts are applied to the analytic signal, from a Hilbert filter
+        self._hilbert = None
+        m = 0
+        if fc is None and _np.any(_np.imag(self._amp) != 0):
+            m = 32
+            k = _np.arange(-m, m+1)
+            h = _np.zeros(2*m+1)
+            h[k % 2 == 1] = 2/(_np.pi*k[k % 2 == 1])
+            self._hilbert = h * _np.hamming(2*m+1)
+        self._m = m
+        tmin = _np.min(self._tau) if self._tau.size > 0 else 0.0
+        tmax = _np.max(self._tau) if self._tau.size > 0 else 0.0
+        if abs_time:
+            if tmin*fs < width+m:
+                raise ValueError('Arrivals too early for absolute time, use abs_time=False')
+            self.delay_offset = 0.0
+        else:
+            self.delay_offset = tmin - (width+m)/fs
+        self._history = int(_np.ceil((tmax-self.delay_offset)*fs)) + width + m + 2
+        self.reset()
+
+    def reset(self):
+        """Reset the channel to the start of the track."""
+        self._n = 0
+        self._buf = _np.zeros(0, dtype=_np.float64 if self.fc is None else _np.complex128)
+
+    def apply(self, x):
+        """Apply the channel to the next block of the transmit signal.
+
+        :param x: next block of transmit signal
+        :returns: received signal for the block
+        """
+        x = _np.asarray(x, dtype=_np.float64 if self.fc is None else _np.complex128)
+        buf = _np.concatenate((self._buf, x))
+        start = self._n - len(self._buf)
+        if self._hilbert is not None:
+            m = self._m
+            buf = buf + 1j*_np.convolve(buf, self._hilbert)[m:m+len(buf)]
+        n = self._n + _np.arange(len(x))
+        t = self.times[0] + n/self.fs
+        y = _np.zeros(len(x), dtype=_np.complex128)
+        for k in range(len(self._tau)):
+            tau = _np.interp(t, self.times, self._tau[k])
+            amp = _np.interp(t, self.times, self._amp[k].real) + 1j*_np.interp(t, self.times, self._amp[k].imag)
+            if self.fc is not None:
+                amp *= _np.exp(-2j*_np.pi*self.fc*tau)
+            d = n - (tau-self.delay_offset)*self.fs - start
+            if self.width == 0:
+                ndx = _np.round(d).astype(_np.int64)[:,None]
+                w = _np.ones(ndx.shape)
+            else:
+                ndx = _np.floor(d).astype(_np.int64)[:,None] + _np.arange(1-self.width, self.width+1)
+                u = ndx - d[:,None]
+                w = _np.sinc(u) * (0.5+0.5*_np.cos(_np.pi*u/self.width))
+            # samples before the start of the signal are zero
+            valid = _np.logical_and(ndx >= 0, ndx < len(buf))
+            y += amp * _np.sum(_np.where(valid, w*buf[_np.clip(ndx, 0, len(buf)-1)], 0), axis=1)
+        self._n += len(x)
+        self._buf = _np.concatenate((self._buf, x))[-self._history:]
+        return _np.real(y) if self.fc is None else y
 
 def plot_arrivals(arrivals, dB=False, color='blue', **kwargs):
     """Plots the arrival times and amplitudes.
@@ -462,15 +1553,20 @@ def plot_rays(rays, env=None, **kwargs):
         plot_env(env)
     _plt.hold(oh)
 
-def plot_transmission_loss(tloss, env=None, **kwargs):
+def plot_transmission_loss(tloss, env=None, maxpts=1000, **kwargs):
     """Plots transmission loss.
 
     :param tloss: complex transmission loss
     :param env: environment definition
+    :param maxpts: maximum number of points to plot along each axis
 
     If environment definition is provided, it is overlayed over this plot using default
     parameters for `arlpy.uwapm.plot_env()`.
 
+    Large transmission loss grids are decimated to at most `maxpts` points along each
+    axis, and only the decimated points are read when `tloss` is a
+    :class:`arlpy.uwapm.TransmissionLossFile`.
+
     Other keyword arguments applicable for `arlpy.plot.image()` are also supported.
 
     >>> import arlpy.uwapm as pm
@@ -490,12 +1586,244 @@ def plot_transmission_loss(tloss, env=None, **kwargs):
     if xr[1]-xr[0] > 10000:
         xr = (min(tloss.columns)/1000, max(tloss.columns)/1000)
         xlabel = 'Range (km)'
+    ystep = int(_np.ceil(tloss.shape[0]/maxpts))
+    xstep = int(_np.ceil(tloss.shape[1]/maxpts))
+    img = _np.asarray(tloss.values[::ystep,::xstep])
     oh = _plt.hold()
-    _plt.image(20*_np.log10(_fi.epsilon+_np.abs(_np.flipud(_np.array(tloss)))), x=xr, y=yr, xlabel=xlabel, ylabel='Depth (m)', xlim=xr, ylim=yr, **kwargs)
+    _plt.image(20*_np.log10(_fi.epsilon+_np.abs(_np.flipud(img))), x=xr, y=yr, xlabel=xlabel, ylabel='Depth (m)', xlim=xr, ylim=yr, **kwargs)
     if env is not None:
         plot_env(env, rx_plot=False)
     _plt.hold(oh)
 
+class TransmissionLossFile:
+    """Transmission loss stored in a file.
+
+    :param filename: name of .npy file holding the transmission loss
+
+    Transmission loss grids computed by :func:`arlpy.uwapm.compute_transmission_loss`
+    with the `out` option are returned as this object. The complex transmission loss
+    is memory-mapped from the file, so only the parts that are accessed are read.
+    The `index` (receiver depths) and `columns` (receiver ranges) are available as for
+    an in-memory transmission loss table, and the data may be sliced like a numpy array.
+
+    >>> import arlpy.uwapm as pm
+    >>> tloss = pm.TransmissionLossFile('tloss.npy')
+    >>> tloss.shape
+    (2500, 10000)
+    >>> row = tloss[100,:]
+    >>> pm.plot_transmission_loss(tloss, width=1000)
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.values = _np.load(filename, mmap_mode='r')
+        with _np.load(self._axes_filename(filename)) as axes:
+            self.index = _shd_index(axes['frequency'], axes['tx_depth'], axes['rx_depth'])
+            self.columns = axes['rx_range']
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __array__(self, dtype=None):
+        return _np.asarray(self.values, dtype=dtype)
+
+    def to_frame(self):
+        """Load the transmission loss into memory as a table."""
+        return _pd.DataFrame(_np.asarray(self.values), index=self.index, columns=self.columns)
+
+    @staticmethod
+    def _axes_filename(filename):
+        return _os.path.splitext(filename)[0]+'.axes.npz'
+
+    @classmethod
+    def _write(cls, filename, pressure, freq, tx_depth, rx_depth, rx_range, dtype):
+        _np.savez(cls._axes_filename(filename), frequency=freq, tx_depth=tx_depth, rx_depth=rx_depth, rx_range=rx_range)
+        data = _np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=pressure.shape)
+        nrows = max(1, (1<<24)//(16*pressure.shape[1]))
+        for j in range(0, pressure.shape[0], nrows):
+            data[j:j+nrows] = pressure[j:j+nrows]
+        data.flush()
+        del data
+        return cls(filename)
+
+def load_shd(filename, complex64=False):
+    """Load the pressure field from a Bellhop shade file.
+
+    :param filename: name of shade file
+    :param complex64: True to map single precision pressure from the file, False to load double precision pressure
+    :returns: (pressure, frequencies, transmitter depths, receiver depths, receiver ranges)
+
+    The complex pressure is returned as an array with dimensions (frequency, transmitter
+    depth, receiver depth, receiver range), and may hold results from multiple frequencies
+    and transmitters. With `complex64` set to True, the array is a read-only memory-mapped
+    view of the file, so no data is loaded until it is accessed. Otherwise, the pressure
+    is loaded into a double precision array.
+
+    >>> import arlpy.uwapm as pm
+    >>> pressure, freq, tx_depth, rx_depth, rx_range = pm.load_shd('tloss.shd')
+    >>> pressure.shape
+    (1, 1, 25, 1000)
+    """
+    with open(filename, 'rb') as f:
+        recl, = _unpack('i', f.read(4))
+        f.seek(4*recl, 0)
+        ptype = f.read(10).decode('utf8').strip()
+        if ptype != 'rectilin':
+            raise ValueError('Invalid file format (expecting ptype == "rectilin")')
+        f.seek(8*recl, 0)
+        nfreq, ntheta, nsx, nsy, nsd, nrd, nrr, atten = _unpack('iiiiiiif', f.read(32))
+        if ntheta != 1:
+            raise ValueError('Invalid file format (expecting ntheta == 1)')
+        f.seek(12*recl, 0)
+        freq = _np.array(_unpack('f'*nfreq, f.read(4*nfreq)))
+        f.seek(28*recl, 0)
+        pos_s_depth = _np.array(_unpack('f'*nsd, f.read(4*nsd)))
+        f.seek(32*recl, 0)
+        pos_r_depth = _np.array(_unpack('f'*nrd, f.read(4*nrd)))
+        f.seek(36*recl, 0)
+        pos_r_range = _np.array(_unpack('f'*nrr, f.read(4*nrr)))
+    # each record holds a row of pressure for one (frequency, source depth, receiver depth),
+    # padded to the record length
+    nrec = nfreq*nsd*nrd
+    data = _np.memmap(filename, dtype=_np.float32, mode='r', offset=40*recl, shape=((nrec-1)*recl+2*nrr,))
+    pressure = _np.lib.stride_tricks.as_strided(data, shape=(nrec, 2*nrr), strides=(4*recl, 4), writeable=False)
+    pressure = pressure.view(_np.complex64).reshape(nfreq, nsd, nrd, nrr)
+    if not complex64:
+        pressure = pressure.astype(_np.complex128)
+    return pressure, freq, pos_s_depth, pos_r_depth, pos_r_range
+
+def save_results(results, path, compact=True):
+    """Save propagation model results to a directory of binary files.
+
+    :param results: arrivals, rays, eigenrays or transmission loss
+    :param path: directory to save results in (created if necessary)
+    :param compact: True to store values with reduced precision, False to store them as is
+
+    Each column of the results is stored in its own numpy binary file, so that
+    results can be reloaded without parsing, memory-mapped, and loaded one column
+    at a time (see :func:`arlpy.uwapm.load_results`). Ray paths are stored as a single
+    array of points, with the offset of each ray into it. With `compact` set to True,
+    integer columns are stored in the smallest integer type (at least int16) that
+    holds them, and floating point and complex values in single precision, except
+    for arrival times which are kept in double precision.
+
+    >>> import arlpy.uwapm as pm
+    >>> env = pm.create_env2d()
+    >>> arrivals = pm.compute_arrivals(env)
+    >>> pm.save_results(arrivals, 'arrivals')
+    """
+    if isinstance(results, TransmissionLossFile):
+        results = _pd.DataFrame(results.values, index=results.index, columns=results.columns, copy=False)
+    if not isinstance(results, _pd.DataFrame):
+        raise ValueError('Results must be a DataFrame or TransmissionLossFile')
+    _os.makedirs(path, exist_ok=True)
+    meta = {'format': 'arlpy.uwapm', 'version': 1, 'index': [], 'columns': []}
+    # index and column labels are stored at full precision, so that lookups by label are unaffected
+    for j in range(results.index.nlevels):
+        level = {'name': results.index.names[j], 'file': 'index%d.npy' % (j), 'type': 'array'}
+        v = results.index.get_level_values(j).values
+        if v.dtype == _np.object_:
+            # labels such as strings are stored as text, so that they load without unpickling
+            level['type'] = 'str'
+            v = v.astype(_np.str_)
+        _np.save(_os.path.join(path, level['file']), v)
+        meta['index'].append(level)
+    numeric = _pd.api.types.is_numeric_dtype(results.columns.dtype)
+    if numeric and len(results.columns) > 0 and len(set(results.dtypes)) == 1 and results.dtypes.iloc[0] != _np.object_:
+        # transmission loss grids are stored as a single 2D array
+        meta['kind'] = 'grid'
+        _np.save(_os.path.join(path, 'columns.npy'), _np.asarray(results.columns))
+        _np.save(_os.path.join(path, 'values.npy'), _compact_array(results.values, compact))
+    else:
+        meta['kind'] = 'table'
+        for j, c in enumerate(results.columns):
+            v = results[c].values
+            col = {'name': c, 'file': 'column%d.npy' % (j), 'type': 'array'}
+            if v.dtype == _np.object_:
+                if all(isinstance(x, _np.ndarray) for x in v):
+                    col['type'] = 'ragged'
+                    col['offsets'] = 'column%d.offsets.npy' % (j)
+                    lengths = _np.array([len(x) for x in v], dtype=_np.int64)
+                    _np.save(_os.path.join(path, col['offsets']), _np.concatenate(([0], _np.cumsum(lengths))))
+                    v = _compact_array(_np.concatenate(v) if len(v) > 0 else _np.zeros((0, 2)), compact)
+                else:
+                    col['type'] = 'str'
+                    v = v.astype(_np.str_)
+            elif c != 'time_of_arrival':
+                v = _compact_array(v, compact)
+            _np.save(_os.path.join(path, col['file']), v)
+            meta['columns'].append(col)
+    with open(_os.path.join(path, 'meta.json'), 'wt') as f:
+        _json.dump(meta, f, indent=2)
+
+def load_results(path, columns=None, mmap_mode=None):
+    """Load propagation model results saved by :func:`arlpy.uwapm.save_results`.
+
+    :param path: directory that results were saved in
+    :param columns: list of columns to load (None to load all columns)
+    :param mmap_mode: None to read the results into memory, or 'r' to memory-map them
+    :returns: results as saved
+
+    Values are loaded in the precision that they were stored in. Ray paths are
+    loaded as views into a single array of points. For transmission loss grids,
+    `columns` selects receiver ranges, and with `mmap_mode` set to 'r', the grid
+    is a read-only view of the file, so no data is loaded until it is accessed.
+
+    >>> import arlpy.uwapm as pm
+    >>> arrivals = pm.load_results('arrivals', columns=['time_of_arrival', 'arrival_amplitude'])
+    """
+    with open(_os.path.join(path, 'meta.json'), 'rt') as f:
+        meta = _json.load(f)
+    if meta.get('format') != 'arlpy.uwapm':
+        raise ValueError('Not a uwapm results directory: '+path)
+    load = lambda fname: _np.load(_os.path.join(path, fname), mmap_mode=mmap_mode)
+    levels = [load(x['file']) for x in meta['index']]
+    levels = [v.astype(_np.object_) if x.get('type') == 'str' else v for v, x in zip(levels, meta['index'])]
+    names = [x['name'] for x in meta['index']]
+    if len(levels) == 1:
+        index = _pd.Index(levels[0], name=names[0])
+    else:
+        index = _pd.MultiIndex.from_arrays(levels, names=names)
+    if meta['kind'] == 'grid':
+        cols = load('columns.npy')
+        values = load('values.npy')
+        if columns is not None:
+            ndx = _np.nonzero(_np.isin(cols, columns))[0]
+            cols = cols[ndx]
+            values = values[:,ndx]
+        return _pd.DataFrame(values, index=index, columns=cols, copy=False)
+    data = {}
+    for col in meta['columns']:
+        if columns is not None and col['name'] not in columns:
+            continue
+        v = load(col['file'])
+        if col['type'] == 'ragged':
+            offsets = load(col['offsets'])
+            r = _np.empty(len(offsets)-1, dtype=_np.object_)
+            for j in range(len(r)):
+                r[j] = v[offsets[j]:offsets[j+1]]
+            v = r
+        elif col['type'] == 'str':
+            v = v.astype(_np.object_)
+        data[col['name']] = v
+    if columns is not None:
+        missing = [c for c in columns if c not in data]
+        if len(missing) > 0:
+            raise KeyError('Unknown columns: '+', '.join(map(str, missing)))
+        data = {c: data[c] for c in columns}
+    return _pd.DataFrame(data, index=index)
+
 def models(env=None, task=None):
     """List available models.
 
@@ -503,10 +1831,17 @@ def models(env=None, task=None):
     :param task: arrivals/eigenrays/rays/coherent/incoherent/semicoherent
     :returns: list of models that can be used
 
+    The built-in `image` model is an image-source model for environments with
+    constant sound speed, flat bottom and flat surface, and only computes arrivals.
+    When it supports an environment, it is preferred over `bellhop`, as it does not
+    need to run an external process.
+
     >>> import arlpy.uwapm as pm
     >>> pm.models()
-    ['bellhop']
+    ['image', 'bellhop']
     >>> env = pm.create_env2d()
+    >>> pm.models(env, task=arrivals)
+    ['image', 'bellhop']
     >>> pm.models(env, task=coherent)
     ['bellhop']
     """
@@ -520,6 +1855,169 @@ def models(env=None, task=None):
             rv.append(m[0])
     return rv
 
+def probe_models():
+    """Probe for installed propagation models.
+
+    :returns: list of models that are available
+
+    Checking if a model is available may require launching it, so the result of the
+    check is cached for the life of the process and reused by :func:`arlpy.uwapm.models`
+    and model selection in the `compute_*` functions. This function may be called at
+    startup to perform the checks ahead of the first propagation query.
+
+    >>> import arlpy.uwapm as pm
+    >>> pm.probe_models()
+    ['image', 'bellhop']
+    """
+    return models()
+
+def invalidate_models():
+    """Discard cached model availability information.
+
+    This should be called if a propagation model is installed, removed or updated
+    while the process is running. The models are probed again when next needed.
+
+    >>> import arlpy.uwapm as pm
+    >>> pm.invalidate_models()
+    >>> pm.probe_models()
+    ['image', 'bellhop']
+    """
+    with _probes_lock:
+        _probes.clear()
+
+def set_timeout(timeout):
+    """Set the default time limit for propagation model runs.
+
+    :param timeout: maximum time to wait for a model run in seconds (None for no limit)
+
+    A model run that does not complete within its time limit is terminated, its working
+    files are removed, and a `TimeoutError` is raised. The default time limit applies to
+    all model runs for which a `timeout` is not explicitly specified.
+
+    Model runs may also be cancelled by passing a `threading.Event` as the `cancel`
+    argument to the `compute_*` functions, and setting the event from another thread.
+    A cancelled model run is terminated, its working files are removed, and a
+    `concurrent.futures.CancelledError` is raised.
+
+    >>> import arlpy.uwapm as pm
+    >>> pm.set_timeout(60)
+    """
+    global _timeout
+    _timeout = timeout
+
+def set_stats_hook(hook):
+    """Set a callback to receive timing and size statistics for each model run.
+
+    :param hook: function called with a dictionary of statistics after each model run (None to disable)
+
+    The statistics dictionary holds:
+
+    - `model`: name of the propagation model
+    - `task`: model task (e.g. `arrivals` or `coherent`)
+    - `cached`: True if the results were loaded from the cache
+    - `env_write_time`: time to write the model input files (s)
+    - `run_wall_time`: elapsed time of the model process (s)
+    - `run_cpu_time`: CPU time used by the model process (s), if available (not for asynchronous runs)
+    - `output_size`: size of the model output file (bytes)
+    - `parse_time`: time to load the model output (s)
+    - `result_size`: memory used by the results (bytes)
+    - `total_time`: total time for the model run (s)
+
+    Entries that do not apply to a model run (e.g. those related to the model process
+    when results are loaded from the cache) are omitted. Statistics are only collected
+    when a hook is set, so there is no overhead otherwise. The hook may be called from
+    worker threads during batch or asynchronous runs.
+
+    >>> import arlpy.uwapm as pm
+    >>> stats = []
+    >>> pm.set_stats_hook(stats.append)
+    >>> arrivals = pm.compute_arrivals(pm.create_env2d())
+    >>> stats[0]['run_wall_time']
+    0.0853
+    """
+    global _stats_hook
+    _stats_hook = hook
+
+def set_workspace(path):
+    """Set the scratch directory used for propagation model working files.
+
+    :param path: directory to hold working files
+
+    Each worker thread uses its own subdirectory of the workspace, which is reused
+    across model runs. Working files are removed as soon as a model run completes
+    (unless `debug` is enabled). Placing the workspace on a memory-backed filesystem
+    (such as `/dev/shm` on Linux) avoids disk I/O for the working files. By default,
+    the workspace is located in the system temporary directory.
+
+    >>> import arlpy.uwapm as pm
+    >>> pm.set_workspace('/dev/shm/arlpy-uwapm')
+    """
+    _workspace['path'] = path
+
+def clear_workspace():
+    """Remove the workspace and all working files in it.
+
+    This also removes working files left behind by model runs in debug mode or by
+    processes that terminated abnormally. It should not be called while model runs
+    are in progress.
+
+    >>> import arlpy.uwapm as pm
+    >>> pm.clear_workspace()
+    """
+    _shutil.rmtree(_workspace['path'], ignore_errors=True)
+
+def workspace_usage():
+    """Get the disk space used by working files in the workspace.
+
+    :returns: total size of working files in bytes
+
+    >>> import arlpy.uwapm as pm
+    >>> pm.workspace_usage()
+    0
+    """
+    size = 0
+    for dirpath, dirnames, filenames in _os.walk(_workspace['path']):
+        for f in filenames:
+            try:
+                size += _os.path.getsize(_os.path.join(dirpath, f))
+            except OSError:
+                pass
+    return size
+
+def set_cache(enabled=True, path=None, max_size=None):
+    """Configure the on-disk cache of propagation model results.
+
+    :param enabled: True to cache model results, False to always run the model
+    :param path: directory to hold cached results (None to leave unchanged)
+    :param max_size: maximum total size of cached results in bytes (None to leave unchanged)
+
+    Results are cached against a hash of the environment definition, the task, and the
+    name and version of the propagation model used, so a repeated computation returns
+    the cached result instead of running the model again. When the cache grows beyond
+    `max_size`, the least recently used results are evicted. Runs with `debug` enabled
+    always bypass the cache. By default, the cache is enabled, limited to 1 GB and
+    stored in `~/.cache/arlpy/uwapm`.
+
+    >>> import arlpy.uwapm as pm
+    >>> pm.set_cache(path='/tmp/uwapm-cache', max_size=100*1024*1024)
+    >>> pm.set_cache(False)
+    """
+    with _cache_lock:
+        _cache['enabled'] = enabled
+        if path is not None:
+            _cache['path'] = path
+        if max_size is not None:
+            _cache['max_size'] = max_size
+
+def clear_cache():
+    """Remove all cached propagation model results.
+
+    >>> import arlpy.uwapm as pm
+    >>> pm.clear_cache()
+    """
+    with _cache_lock:
+        _shutil.rmtree(_cache['path'], ignore_errors=True)
+
 def _select_model(env, task, model):
     if model is not None:
         for m in _models:
@@ -532,6 +2030,348 @@ def _select_model(env, task, model):
             return (m[0], mm)
     raise ValueError('No suitable propagation model available')
 
+def _compute_batch(func, envs, workers, **kwargs):
+    return _combine_results(_run_batch(func, envs, workers, **kwargs))
+
+def _run_batch(func, envs, workers, **kwargs):
+    envs = list(envs)
+    for env in envs:
+        check_env2d(env)
+    if len(envs) == 0:
+        return []
+    if workers is None:
+        workers = _os.cpu_count() or 1
+    def run(j):
+        try:
+            results = func(envs[j], **kwargs)
+        except _futures.CancelledError:
+            raise
+        except Exception as e:
+            # a failed model run only loses its own environment, not the rest of the batch
+            _warnings.warn('Environment '+str(j)+' skipped: '+type(e).__name__+': '+str(e))
+            return None
+        if results is None:
+            _warnings.warn('Environment '+str(j)+' skipped: model produced no results')
+        return results
+    # model runs spend their time in external processes, so threads are sufficient to keep them all busy
+    with _futures.ThreadPoolExecutor(max_workers=max(1, min(workers, len(envs)))) as pool:
+        return list(pool.map(run, range(len(envs))))
+
+def _unique_values(values):
+    unique = []
+    seen = set()
+    for v in values:
+        h = _hashlib.sha1()
+        _hash_update(h, v)
+        key = h.digest()
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(v)
+    # parameters with any array value are labelled by position
+    if all(_np.isscalar(v) for v in unique):
+        return unique, list(unique)
+    return unique, list(range(len(unique)))
+
+def _combine_results(results, keys=None, names=None):
+    if keys is None:
+        keys = range(len(results))
+    if names is None:
+        names = ['env_ndx']
+    keys = [k for k, r in zip(keys, results) if r is not None]
+    results = [r for r in results if r is not None]
+    if len(results) == 0:
+        return None
+    return _pd.concat(results, keys=keys, names=names)
+
+def _impulse_responses(rx, nrx, t, amp, fs, t0, width):
+    d = (t-t0)*fs
+    if width == 0:
+        ndx = _np.round(d).astype(_np.int64)
+        irlen = _np.max(ndx)+1
+    else:
+        ndx = _np.floor(d).astype(_np.int64)
+        irlen = _np.max(ndx)+width+1
+        ndx = ndx[:,None] + _np.arange(1-width, width+1)
+        x = ndx - d[:,None]
+        amp = amp[:,None] * _np.sinc(x) * (0.5+0.5*_np.cos(_np.pi*x/width))
+        rx = _np.broadcast_to(rx[:,None], ndx.shape)
+        valid = _np.logical_and(ndx >= 0, ndx < irlen)
+        rx, ndx, amp = rx[valid], ndx[valid], amp[valid]
+    # scatter-add taps, so that arrivals in the same sample are summed
+    ndx = rx*irlen + ndx
+    ir = _np.bincount(ndx, weights=_np.real(amp), minlength=nrx*irlen) + 1j*_np.bincount(ndx, weights=_np.imag(amp), minlength=nrx*irlen)
+    return ir.reshape(nrx, irlen)
+
+def _track_paths(arrivals, track, tx_depth_ndx, env):
+    if isinstance(track, _pd.DataFrame):
+        track = track[['time', 'rx_depth', 'rx_range']].values
+    track = _np.asarray(track, dtype=_np.float64).reshape(-1, 3)
+    times = track[:,0]
+    if _np.any(_np.diff(times) <= 0):
+        raise ValueError('Track times must be strictly increasing')
+    arrivals = arrivals[arrivals.tx_depth_ndx == tx_depth_ndx]
+    rd = arrivals.rx_depth_ndx.values.astype(_np.int64)
+    rr = arrivals.rx_range_ndx.values.astype(_np.int64)
+    axes = []
+    for key, ndx in [('rx_depth', rd), ('rx_range', rr)]:
+        if env is not None:
+            axis = _np.atleast_1d(_np.asarray(env[key], dtype=_np.float64))
+        else:
+            # receivers without arrivals are interpolated between their neighbours on the grid
+            axis = _np.full(_np.max(ndx)+1 if len(ndx) > 0 else 1, _np.nan)
+            axis[ndx] = arrivals[key].values
+            known = _np.nonzero(~_np.isnan(axis))[0]
+            if len(known) == 0:
+                raise ValueError('No arrivals for transmitter')
+            axis = _np.interp(_np.arange(len(axis)), known, axis[known])
+        axes.append(axis)
+    # paths are identified by their bounces and initial direction, keeping the strongest arrival of each
+    keys = _np.column_stack((arrivals.surface_bounces.values, arrivals.bottom_bounces.values, arrivals.angle_of_departure.values >= 0)).astype(_np.int64)
+    keys, path = _np.unique(keys, axis=0, return_inverse=True)
+    path = path.ravel()
+    a = arrivals.arrival_amplitude.values.astype(_np.complex128)
+    order = _np.argsort(_np.abs(a), kind='stable')
+    shape = (len(keys), len(axes[0]), len(axes[1]))
+    tau = _np.full(shape, _np.nan)
+    amp = _np.zeros(shape, dtype=_np.complex128)
+    tau[path[order], rd[order], rr[order]] = _np.real(arrivals.time_of_arrival.values)[order]
+    amp[path[order], rd[order], rr[order]] = a[order]
+    # bilinear interpolation of each path between the four surrounding receivers
+    (i0, i1, wi), (j0, j1, wj) = [_axis_weights(axes[j], track[:,j+1]) for j in range(2)]
+    num = _np.zeros((len(keys), len(times)))
+    den = _np.zeros((len(keys), len(times)))
+    pamp = _np.zeros((len(keys), len(times)), dtype=_np.complex128)
+    for i, j, w in [(i0, j0, (1-wi)*(1-wj)), (i0, j1, (1-wi)*wj), (i1, j0, wi*(1-wj)), (i1, j1, wi*wj)]:
+        t = tau[:,i,j]
+        p = ~_np.isnan(t)
+        num += _np.where(p, w*_np.nan_to_num(t), 0)
+        den += _np.where(p, w, 0)
+        pamp += w*amp[:,i,j]
+    present = den > 0
+    with _np.errstate(invalid='ignore', divide='ignore'):
+        ptau = _np.where(present, num/den, _np.nan)
+    points = _np.column_stack((_np.clip(track[:,1], axes[0].min(), axes[0].max()), _np.clip(track[:,2], axes[1].min(), axes[1].max())))
+    return times, keys, ptau, pamp, present, points
+
+def _axis_weights(axis, v):
+    if len(axis) == 1:
+        z = _np.zeros(len(v), dtype=_np.int64)
+        return z, z, _np.zeros(len(v))
+    order = _np.argsort(axis)
+    s = axis[order]
+    j = _np.clip(_np.searchsorted(s, v)-1, 0, len(s)-2)
+    w = _np.clip((v-s[j])/(s[j+1]-s[j]), 0, 1)
+    return order[j], order[j+1], w
+
+def _shd_index(freq, tx_depth, rx_depth):
+    levels = []
+    if len(freq) > 1:
+        levels.append(('frequency', freq))
+    if len(tx_depth) > 1:
+        levels.append(('tx_depth', tx_depth))
+    if len(levels) == 0:
+        return rx_depth
+    levels.append(('rx_depth', rx_depth))
+    return _pd.MultiIndex.from_product([v for _, v in levels], names=[k for k, _ in levels])
+
+def _probe(key, func):
+    with _probes_lock:
+        if key not in _probes:
+            _probes[key] = func()
+        return _probes[key]
+
+def _tx_env(env, tx_depth_ndx):
+    if tx_depth_ndx is not None and _np.size(env['tx_depth']) > 1:
+        env = env.copy()
+        env['tx_depth'] = env['tx_depth'][tx_depth_ndx]
+    return env
+
+def _eigenray_env(env, tx_depth_ndx, rx_depth_ndx, rx_range_ndx):
+    env = _tx_env(env, tx_depth_ndx).copy()
+    if _np.size(env['rx_depth']) > 1:
+        env['rx_depth'] = env['rx_depth'][rx_depth_ndx]
+    if _np.size(env['rx_range']) > 1:
+        env['rx_range'] = env['rx_range'][rx_range_ndx]
+    return env
+
+def _run_model(model_name, model, env, task, debug, timeout=None, cancel=None, **kwargs):
+    if debug:
+        print('[DEBUG] Model: '+model_name)
+    if timeout is None:
+        timeout = _timeout
+    stats = _new_stats(model_name, task)
+    key = None
+    if _cache['enabled'] and not debug and 'out' not in kwargs and getattr(model, 'cacheable', True):
+        key = _cache_key(env, task, model_name, model.version(), kwargs)
+        results = _cache_load(key)
+        if results is not None:
+            return _report_stats(stats, results, cached=True)
+    if stats is not None:
+        kwargs['stats'] = stats
+    results = model.run(env, task, debug, timeout=timeout, cancel=cancel, **kwargs)
+    if key is not None and results is not None:
+        _cache_store(key, results)
+    return _report_stats(stats, results)
+
+async def _compute_async(env, task, model, debug, timeout=None, **kwargs):
+    loop = _asyncio.get_event_loop()
+    (model_name, model) = await loop.run_in_executor(None, _select_model, env, task, model)
+    if debug:
+        print('[DEBUG] Model: '+model_name)
+    if timeout is None:
+        timeout = _timeout
+    stats = _new_stats(model_name, task)
+    key = None
+    if _cache['enabled'] and not debug and getattr(model, 'cacheable', True):
+        key = _cache_key(env, task, model_name, model.version(), kwargs)
+        results = await loop.run_in_executor(None, _cache_load, key)
+        if results is not None:
+            return _report_stats(stats, results, cached=True)
+    if stats is not None:
+        kwargs['stats'] = stats
+    if hasattr(model, 'run_async'):
+        results = await model.run_async(env, task, debug, timeout=timeout, **kwargs)
+    else:
+        results = await _asyncio.wait_for(loop.run_in_executor(None, _functools.partial(model.run, env, task, debug, timeout=timeout, **kwargs)), timeout)
+    if key is not None and results is not None:
+        await loop.run_in_executor(None, _cache_store, key, results)
+    return _report_stats(stats, results)
+
+def _new_stats(model_name, task):
+    if _stats_hook is None:
+        return None
+    return {'model': model_name, 'task': task, 'cached': False, 'total_time': _time.perf_counter()}
+
+def _report_stats(stats, results, cached=False):
+    if stats is not None:
+        stats['cached'] = cached
+        stats['total_time'] = _time.perf_counter() - stats['total_time']
+        stats['result_size'] = _result_size(results)
+        hook = _stats_hook
+        if hook is not None:
+            hook(stats)
+    return results
+
+def _result_size(results):
+    if results is None:
+        return 0
+    if isinstance(results, _pd.DataFrame):
+        size = int(results.memory_usage(index=True, deep=False).sum())
+        for c in results.columns[results.dtypes == _np.object_]:
+            size += sum(v.nbytes for v in results[c].values if isinstance(v, _np.ndarray))
+        return size
+    return int(getattr(getattr(results, 'values', results), 'nbytes', 0))
+
+def _async_semaphore():
+    loop = _asyncio.get_event_loop()
+    sem = _async_semaphores.get(loop)
+    if sem is None:
+        sem = _asyncio.Semaphore(_async_workers)
+        _async_semaphores[loop] = sem
+    return sem
+
+def _format_rows(fmt, a):
+    a = _np.asarray(a, dtype=_np.float64)
+    if a.size < 256:
+        return (fmt*(a.size//fmt.count('%'))) % tuple(a.ravel().tolist())
+    # large arrays (e.g. receiver grids) usually repeat across runs in a sweep, so reuse their text
+    h = _hashlib.sha1(fmt.encode())
+    _hash_update(h, a)
+    key = h.digest()
+    with _sections_lock:
+        if key in _sections:
+            _sections.move_to_end(key)
+            return _sections[key]
+    text = (fmt*(a.size//fmt.count('%'))) % tuple(a.ravel().tolist())
+    with _sections_lock:
+        _sections[key] = text
+        while len(_sections) > _sections_max:
+            _sections.popitem(last=False)
+    return text
+
+def _compact_array(a, compact):
+    a = _np.asarray(a)
+    if not compact or a.size == 0:
+        return a
+    if _np.issubdtype(a.dtype, _np.integer):
+        lo, hi = _np.min(a), _np.max(a)
+        for t in [_np.int16, _np.int32]:
+            if lo >= _np.iinfo(t).min and hi <= _np.iinfo(t).max:
+                return a.astype(t)
+        return a
+    if a.dtype == _np.float64:
+        return a.astype(_np.float32)
+    if a.dtype == _np.complex128:
+        return a.astype(_np.complex64)
+    return a
+
+def _workspace_file(suffix):
+    path = _os.path.join(_workspace['path'], '%d-%d' % (_os.getpid(), _threading.get_ident()))
+    _os.makedirs(path, exist_ok=True)
+    return _mkstemp(suffix=suffix, dir=path)
+
+def _workspace_cleanup(fname_base):
+    for f in _glob.glob(_glob.escape(fname_base)+'.*'):
+        try:
+            _os.unlink(f)
+        except OSError:
+            pass
+
+def _hash_update(h, v):
+    if isinstance(v, (str, bytes)) or v is None:
+        h.update(repr(v).encode())
+    else:
+        # numbers are hashed by value, so that equivalent ints, floats and arrays share a key
+        v = _np.ascontiguousarray(v, dtype=_np.float64)
+        h.update(str(v.shape).encode())
+        h.update(v.tobytes())
+
+def _cache_key(env, task, model_name, model_version, options):
+    h = _hashlib.sha256()
+    for k in sorted(env.keys()):
+        h.update(k.encode())
+        _hash_update(h, env[k])
+    for v in [task, model_name, model_version]:
+        _hash_update(h, v)
+    for k in sorted(options.keys()):
+        h.update(k.encode())
+        _hash_update(h, options[k])
+    return h.hexdigest()
+
+def _cache_load(key):
+    fname = _os.path.join(_cache['path'], key+'.pkl')
+    try:
+        with open(fname, 'rb') as f:
+            results = _pickle.load(f)
+        _os.utime(fname)
+    except Exception:
+        return None
+    return results
+
+def _cache_store(key, results):
+    path = _cache['path']
+    try:
+        _os.makedirs(path, exist_ok=True)
+        fh, tmpname = _mkstemp(suffix='.tmp', dir=path)
+        with _os.fdopen(fh, 'wb') as f:
+            _pickle.dump(results, f, protocol=_pickle.HIGHEST_PROTOCOL)
+        _os.replace(tmpname, _os.path.join(path, key+'.pkl'))
+        with _cache_lock:
+            entries = []
+            for e in _os.scandir(path):
+                if e.name.endswith('.pkl'):
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+            size = sum([e[1] for e in entries])
+            for _, sz, fname in sorted(entries):
+                if size <= _cache['max_size']:
+                    break
+                _os.unlink(fname)
+                size -= sz
+    except OSError:
+        pass
+
 ### Bellhop propagation model ###
 
 class _Bellhop:
@@ -542,16 +2382,73 @@ class _Bellhop:
     def supports(self, env=None, task=None):
         if env is not None and env['type'] != '2D':
             return False
-        fh, fname = _mkstemp(suffix='.env')
+        return _probe('bellhop', self._probe)
+
+    def version(self):
+        return _probe('bellhop.version', self._version)
+
+    def _probe(self):
+        fh, fname = _workspace_file('.env')
         _os.close(fh)
         fname_base = fname[:-4]
-        rv = self._bellhop(fname_base)
-        self._unlink(fname_base+'.env')
-        self._unlink(fname_base+'.prt')
-        self._unlink(fname_base+'.log')
-        return rv
+        try:
+            return self._bellhop(fname_base)
+        finally:
+            _workspace_cleanup(fname_base)
+
+    def _version(self):
+        exe = _shutil.which('bellhop.exe')
+        if exe is None:
+            return None
+        st = _os.stat(exe)
+        return '%s:%d:%d' % (exe, st.st_size, int(st.st_mtime))
+
+    def run(self, env, task, debug=False, timeout=None, cancel=None, stats=None, **kwargs):
+        taskcode, load = self._task(task)
+        t = _time.perf_counter()
+        fname_base = self._create_env_file(env, taskcode)
+        if stats is not None:
+            stats['env_write_time'] = _time.perf_counter() - t
+        try:
+            ok = self._bellhop(fname_base, timeout=timeout, cancel=cancel, stats=stats)
+            if ok:
+                results = self._load(load, fname_base, stats, **kwargs)
+            else:
+                results = None
+        finally:
+            self._cleanup(fname_base, debug)
+        return results
+
+    async def run_async(self, env, task, debug=False, timeout=None, stats=None, **kwargs):
+        loop = _asyncio.get_event_loop()
+        taskcode, load = self._task(task)
+        t = _time.perf_counter()
+        fname_base = await loop.run_in_executor(None, self._create_env_file, env, taskcode)
+        if stats is not None:
+            stats['env_write_time'] = _time.perf_counter() - t
+        try:
+            ok = await self._bellhop_async(fname_base, timeout=timeout, stats=stats)
+            if ok:
+                results = await loop.run_in_executor(None, _functools.partial(self._load, load, fname_base, stats, **kwargs))
+            else:
+                results = None
+        finally:
+            self._cleanup(fname_base, debug)
+        return results
 
-    def run(self, env, task, debug=False):
+    def _load(self, load, fname_base, stats, **kwargs):
+        if stats is None:
+            return load(fname_base, **kwargs)
+        stats['output_size'] = 0
+        for ext in ['.arr', '.ray', '.shd']:
+            if _os.path.exists(fname_base+ext):
+                stats['output_size'] += _os.path.getsize(fname_base+ext)
+        t = _time.perf_counter()
+        results = load(fname_base, **kwargs)
+        stats['parse_time'] = _time.perf_counter() - t
+        return results
+
+    def _task(self, task):
         taskmap = {
             arrivals:     ['A', self._load_arrivals],
             eigenrays:    ['E', self._load_rays],
@@ -560,192 +2457,338 @@ class _Bellhop:
             incoherent:   ['I', self._load_shd],
             semicoherent: ['S', self._load_shd]
         }
-        fname_base = self._create_env_file(env, taskmap[task][0])
-        if self._bellhop(fname_base):
-            results = taskmap[task][1](fname_base)
-        else:
-            results = None
+        return taskmap[task]
+
+    def _cleanup(self, fname_base, debug):
         if debug:
             print('[DEBUG] Bellhop working files: '+fname_base+'.*')
         else:
-            self._unlink(fname_base+'.env')
-            self._unlink(fname_base+'.bty')
-            self._unlink(fname_base+'.ati')
-            self._unlink(fname_base+'.sbp')
-            self._unlink(fname_base+'.prt')
-            self._unlink(fname_base+'.log')
-            self._unlink(fname_base+'.arr')
-            self._unlink(fname_base+'.ray')
-            self._unlink(fname_base+'.shd')
-        return results
+            _workspace_cleanup(fname_base)
 
-    def _bellhop(self, *args):
+    def _bellhop(self, *args, timeout=None, cancel=None, stats=None):
+        if cancel is not None and cancel.is_set():
+            raise _futures.CancelledError('Bellhop run cancelled')
+        t0 = _time.perf_counter()
         try:
-            _proc.call(['bellhop.exe'] + list(args), stderr=_proc.STDOUT)
+            proc = _proc.Popen(['bellhop.exe'] + list(args), stderr=_proc.STDOUT)
         except OSError:
             return False
-        return True
-
-    def _unlink(self, f):
         try:
-            os.unlink(f)
-        except:
-            pass
+            if cancel is None and stats is None:
+                proc.wait(timeout)
+            elif cancel is None and timeout is None:
+                # block until completion, collecting resource usage
+                self._poll(proc, stats, t0, block=True)
+            else:
+                # poll for completion, so that cancellation and timeouts are noticed
+                t = None if timeout is None else _time.monotonic()+timeout
+                dt = 0.001
+                while self._poll(proc, stats, t0) is None:
+                    if cancel is None:
+                        _time.sleep(dt)
+                    elif cancel.wait(dt):
+                        raise _futures.CancelledError('Bellhop run cancelled')
+                    if t is not None and _time.monotonic() > t:
+                        raise _proc.TimeoutExpired(proc.args, timeout)
+                    dt = min(2*dt, 0.05)
+        except _proc.TimeoutExpired:
+            raise TimeoutError('Bellhop did not complete within '+str(timeout)+' s')
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        return True
 
-    def _print(self, fh, s, newline=True):
-        _os.write(fh, (s+'\n' if newline else s).encode())
+    def _poll(self, proc, stats, t0, block=False):
+        if stats is None:
+            return proc.poll()
+        if proc.returncode is not None:
+            return proc.returncode
+        if not hasattr(_os, 'wait4'):
+            rc = proc.wait() if block else proc.poll()
+            if rc is not None:
+                stats['run_wall_time'] = _time.perf_counter() - t0
+            return rc
+        pid, status, usage = _os.wait4(proc.pid, 0 if block else _os.WNOHANG)
+        if pid == 0:
+            return None
+        # the run time is taken when the exit is first seen, not after any wait between polls
+        stats['run_wall_time'] = _time.perf_counter() - t0
+        proc.returncode = _os.waitstatus_to_exitcode(status)
+        stats['run_cpu_time'] = usage.ru_utime + usage.ru_stime
+        return proc.returncode
+
+    async def _bellhop_async(self, *args, timeout=None, stats=None):
+        async with _async_semaphore():
+            # time spent waiting for a slot is not part of the model run time
+            t0 = _time.perf_counter()
+            try:
+                proc = await _asyncio.create_subprocess_exec('bellhop.exe', *args, stderr=_asyncio.subprocess.STDOUT)
+            except OSError:
+                return False
+            try:
+                await _asyncio.wait_for(proc.wait(), timeout)
+                if stats is not None:
+                    stats['run_wall_time'] = _time.perf_counter() - t0
+            except _asyncio.TimeoutError:
+                raise TimeoutError('Bellhop did not complete within '+str(timeout)+' s')
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+        return True
 
-    def _print_array(self, fh, a):
+    def _format_array(self, a):
         if _np.size(a) == 1:
-            self._print(fh, "1")
-            self._print(fh, "%0.4f /" % (a))
-        else:
-            self._print(fh, str(_np.size(a)))
-            for j in a:
-                self._print(fh, "%0.4f " % (j), newline=False)
-            self._print(fh, "/")
+            return "1\n%0.4f /\n" % (a)
+        return str(_np.size(a))+"\n"+_format_rows("%0.4f ", a)+"/\n"
+
+    _beam_types = {None: '', geometric: 'G', gaussian: 'B'}
 
     def _create_env_file(self, env, taskcode):
-        fh, fname = _mkstemp(suffix='.env')
-        fname_base = fname[:-4]
-        self._print(fh, "'"+env['name']+"'")
-        self._print(fh, "%0.4f" % (env['frequency']))
-        self._print(fh, "1")
-        if env['surface'] is None:
-            self._print(fh, "'%cVWT'" % ('S' if env['soundspeed_interp'] == spline else 'C'))
-        else:
-            self._print(fh, "'%cVWT*'" % ('S' if env['soundspeed_interp'] == spline else 'C'))
-            self._create_bty_ati_file(fname_base+'.ati', env['surface'], env['surface_interp'])
+        ss = 'S' if env['soundspeed_interp'] == spline else 'C'
         max_depth = env['depth'] if _np.size(env['depth']) == 1 else _np.max(env['depth'][:,1])
-        self._print(fh, "1 0.0 %0.4f" % (max_depth))
         svp = env['soundspeed']
-        if _np.size(svp) == 1:
-            self._print(fh, "0.0 %0.4f /" % (svp))
-            self._print(fh, "%0.4f %0.4f /" % (max_depth, svp))
-        else:
-            for j in range(svp.shape[0]):
-                self._print(fh, "%0.4f %0.4f /" % (svp[j,0], svp[j,1]))
         depth = env['depth']
-        if _np.size(depth) == 1:
-            self._print(fh, "'A' %0.4f" % (env['bottom_roughness']))
-        else:
-            self._print(fh, "'A*' %0.4f" % (env['bottom_roughness']))
-            self._create_bty_ati_file(fname_base+'.bty', depth, env['depth_interp'])
-        self._print(fh, "%0.4f %0.4f 0.0 %0.4f %0.4f /" % (max_depth, env['bottom_soundspeed'], env['bottom_density']/1000, env['bottom_absorption']))
-        self._print_array(fh, env['tx_depth'])
-        self._print_array(fh, env['rx_depth'])
-        self._print_array(fh, env['rx_range']/1000)
-        if env['tx_directionality'] is None:
-            self._print(fh, "'"+taskcode+"'")
+        # assemble the complete file in memory, so that it can be written in one call
+        s = ["'"+env['name']+"'\n", "%0.4f\n" % (env['frequency']), "1\n"]
+        s.append("'%cVWT'\n" % (ss) if env['surface'] is None else "'%cVWT*'\n" % (ss))
+        s.append("1 0.0 %0.4f\n" % (max_depth))
+        if _np.size(svp) == 1:
+            s.append("0.0 %0.4f /\n%0.4f %0.4f /\n" % (svp, max_depth, svp))
         else:
-            self._print(fh, "'"+taskcode+" *'")
-            self._create_sbp_file(fname_base+'.sbp', env['tx_directionality'])
-        self._print(fh, "0")
-        self._print(fh, "%0.4f %0.4f /" % (env['min_angle'], env['max_angle']))
-        self._print(fh, "0.0 %0.4f %0.4f" % (1.01*max_depth, 1.01*_np.max(env['rx_range'])/1000))
-        _os.close(fh)
+            s.append(_format_rows("%0.4f %0.4f /\n", svp))
+        s.append(("'A' %0.4f\n" if _np.size(depth) == 1 else "'A*' %0.4f\n") % (env['bottom_roughness']))
+        s.append("%0.4f %0.4f 0.0 %0.4f %0.4f /\n" % (max_depth, env['bottom_soundspeed'], env['bottom_density']/1000, env['bottom_absorption']))
+        s.append(self._format_array(env['tx_depth']))
+        s.append(self._format_array(env['rx_depth']))
+        s.append(self._format_array(env['rx_range']/1000))
+        beam = self._beam_types[env.get('beam_type')]
+        if env['tx_directionality'] is not None:
+            beam += ' *' if beam == '' else '*'
+        s.append("'"+taskcode+beam+"'\n")
+        s.append("%d\n" % (env.get('nbeams', 0)))
+        s.append("%0.4f %0.4f /\n" % (env['min_angle'], env['max_angle']))
+        step = env.get('step', 0)
+        s.append(("0.0" if step == 0 else "%0.4f" % (step)) + " %0.4f %0.4f\n" % (1.01*max_depth, 1.01*_np.max(env['rx_range'])/1000))
+        fh, fname = _workspace_file('.env')
+        fname_base = fname[:-4]
+        try:
+            with _os.fdopen(fh, 'w') as f:
+                f.write(''.join(s))
+            if env['surface'] is not None:
+                self._create_bty_ati_file(fname_base+'.ati', env['surface'], env['surface_interp'])
+            if _np.size(depth) > 1:
+                self._create_bty_ati_file(fname_base+'.bty', depth, env['depth_interp'])
+            if env['tx_directionality'] is not None:
+                self._create_sbp_file(fname_base+'.sbp', env['tx_directionality'])
+        except:
+            _workspace_cleanup(fname_base)
+            raise
         return fname_base
 
     def _create_bty_ati_file(self, filename, depth, interp):
+        depth = _np.asarray(depth, dtype=_np.float64)
         with open(filename, 'wt') as f:
-            f.write("'%c'\n" % ('C' if interp == curvilinear else 'L'))
-            f.write(str(depth.shape[0])+"\n")
-            for j in range(depth.shape[0]):
-                f.write("%0.4f %0.4f\n" % (depth[j,0]/1000, depth[j,1]))
+            f.write("'%c'\n%d\n" % ('C' if interp == curvilinear else 'L', depth.shape[0]))
+            f.write(_format_rows("%0.4f %0.4f\n", _np.column_stack((depth[:,0]/1000, depth[:,1]))))
 
     def _create_sbp_file(self, filename, dir):
         with open(filename, 'wt') as f:
             f.write(str(dir.shape[0])+"\n")
-            for j in range(dir.shape[0]):
-                f.write("%0.4f %0.4f\n" % (dir[j,0], dir[j,1]))
-
-    def _readf(self, f, types):
-        p = _re.split(r' +', f.readline().strip())
-        for j in range(len(p)):
-            if len(types) > j:
-                p[j] = types[j](p[j])
-        return tuple(p)
+            f.write(_format_rows("%0.4f %0.4f\n", dir[:,:2]))
 
     def _load_arrivals(self, fname_base):
         with open(fname_base+'.arr', 'rt') as f:
-            freq, tx_depth_count, rx_depth_count, rx_range_count = self._readf(f, (float, int, int, int))
-            tx_depth = self._readf(f, (float,)*tx_depth_count)
-            rx_depth = self._readf(f, (float,)*rx_depth_count)
-            rx_range = self._readf(f, (float,)*rx_range_count)
-            arrivals = []
-            for j in range(tx_depth_count):
-                f.readline()
-                for k in range(rx_depth_count):
-                    for m in range(rx_range_count):
-                        count = int(f.readline())
-                        for n in range(count):
-                            data = self._readf(f, (float, float, float, float, float, float, int, int))
-                            arrivals.append(_pd.DataFrame({
-                                'tx_depth_ndx': [j],
-                                'rx_depth_ndx': [k],
-                                'rx_range_ndx': [m],
-                                'tx_depth': [tx_depth[j]],
-                                'rx_depth': [rx_depth[k]],
-                                'rx_range': [rx_range[m]],
-                                'arrival_number': [n],
-                                'arrival_amplitude': [data[0]*_np.exp(1j*data[1])],
-                                'time_of_arrival': [data[2]],
-                                'angle_of_departure': [data[4]],
-                                'angle_of_arrival': [data[5]],
-                                'surface_bounces': [data[6]],
-                                'bottom_bounces': [data[7]]
-                            }, index=[len(arrivals)+1]))
-        return _pd.concat(arrivals)
+            data = _np.array(f.read().split(), dtype=_np.float64)
+        tx_depth_count, rx_depth_count, rx_range_count = data[1:4].astype(_np.int64)
+        pos = 4
+        tx_depth = data[pos:pos+tx_depth_count]
+        pos += tx_depth_count
+        rx_depth = data[pos:pos+rx_depth_count]
+        pos += rx_depth_count
+        rx_range = data[pos:pos+rx_range_count]
+        pos += rx_range_count
+        # locate arrivals for each receiver, each arrival being a row of 8 values
+        nrx = tx_depth_count*rx_depth_count*rx_range_count
+        counts = _np.empty(nrx, dtype=_np.int64)
+        starts = _np.empty(nrx, dtype=_np.int64)
+        n = 0
+        for j in range(tx_depth_count):
+            pos += 1
+            for k in range(rx_depth_count*rx_range_count):
+                count = int(data[pos])
+                counts[n] = count
+                starts[n] = pos+1
+                pos += 1+8*count
+                n += 1
+        rx = _np.repeat(_np.arange(nrx), counts)
+        arrival_number = _np.arange(len(rx)) - _np.repeat(_np.cumsum(counts)-counts, counts)
+        rows = data[(starts[rx]+8*arrival_number)[:,None] + _np.arange(8)]
+        tx_depth_ndx, rx_depth_ndx, rx_range_ndx = _np.unravel_index(rx, (tx_depth_count, rx_depth_count, rx_range_count))
+        return _pd.DataFrame({
+            'tx_depth_ndx': tx_depth_ndx,
+            'rx_depth_ndx': rx_depth_ndx,
+            'rx_range_ndx': rx_range_ndx,
+            'tx_depth': tx_depth[tx_depth_ndx],
+            'rx_depth': rx_depth[rx_depth_ndx],
+            'rx_range': rx_range[rx_range_ndx],
+            'arrival_number': arrival_number,
+            'arrival_amplitude': rows[:,0]*_np.exp(1j*rows[:,1]),
+            'time_of_arrival': rows[:,2],
+            'angle_of_departure': rows[:,4],
+            'angle_of_arrival': rows[:,5],
+            'surface_bounces': rows[:,6].astype(_np.int64),
+            'bottom_bounces': rows[:,7].astype(_np.int64)
+        }, index=_np.arange(1, len(rx)+1))
 
     def _load_rays(self, fname_base):
         with open(fname_base+'.ray', 'rt') as f:
-            f.readline()
-            f.readline()
-            f.readline()
-            f.readline()
-            f.readline()
-            f.readline()
-            f.readline()
-            rays = []
-            while True:
-                s = f.readline()
-                if s is None or len(s.strip()) == 0:
-                    break
-                a = float(s)
-                pts, sb, bb = self._readf(f, (int, int, int))
-                ray = _np.empty((pts, 2))
-                for k in range(pts):
-                    ray[k,:] = self._readf(f, (float, float))
-                rays.append(_pd.DataFrame({
-                    'angle_of_departure': [a],
-                    'surface_bounces': [sb],
-                    'bottom_bounces': [bb],
-                    'ray': [ray]
-                }))
-        return _pd.concat(rays)
-
-    def _load_shd(self, fname_base):
-        with open(fname_base+'.shd', 'rb') as f:
-            recl, = _unpack('i', f.read(4))
-            title = str(f.read(80))
-            f.seek(4*recl, 0)
-            ptype = f.read(10).decode('utf8').strip()
-            assert ptype == 'rectilin', 'Invalid file format (expecting ptype == "rectilin")'
-            f.seek(8*recl, 0)
-            nfreq, ntheta, nsx, nsy, nsd, nrd, nrr, atten = _unpack('iiiiiiif', f.read(32))
-            assert nfreq == 1, 'Invalid file format (expecting nfreq == 1)'
-            assert ntheta == 1, 'Invalid file format (expecting ntheta == 1)'
-            assert nsd == 1, 'Invalid file format (expecting nsd == 1)'
-            f.seek(32*recl, 0)
-            pos_r_depth = _unpack('f'*nrd, f.read(4*nrd))
-            f.seek(36*recl, 0)
-            pos_r_range = _unpack('f'*nrr, f.read(4*nrr))
-            pressure = _np.zeros((nrd, nrr), dtype=_np.complex)
-            for ird in range(nrd):
-                recnum = 10 + ird
-                f.seek(recnum*4*recl, 0)
-                temp = _np.array(_unpack('f'*2*nrr, f.read(2*nrr*4)))
-                pressure[ird,:] = temp[::2] + 1j*temp[1::2]
-        return _pd.DataFrame(pressure, index=pos_r_depth, columns=pos_r_range)
+            for j in range(7):
+                f.readline()
+            data = _np.array(f.read().split(), dtype=_np.float64)
+        # each ray has a header of (angle, points, surface bounces, bottom bounces) followed by its points
+        hdr = []
+        pos = 0
+        while pos < len(data):
+            hdr.append(pos)
+            pos += 4+2*int(data[pos+1])
+        hdr = _np.array(hdr, dtype=_np.int64)
+        pts = data[hdr+1].astype(_np.int64)
+        mask = _np.ones(len(data), dtype=_np.bool_)
+        mask[(hdr[:,None]+_np.arange(4)).ravel()] = False
+        points = data[mask].reshape(-1, 2)
+        offsets = _np.cumsum(pts)-pts
+        ray = _np.empty(len(hdr), dtype=_np.object_)
+        for j in range(len(hdr)):
+            ray[j] = points[offsets[j]:offsets[j]+pts[j]]
+        return _pd.DataFrame({
+            'angle_of_departure': data[hdr],
+            'surface_bounces': data[hdr+2].astype(_np.int64),
+            'bottom_bounces': data[hdr+3].astype(_np.int64),
+            'ray': ray
+        })
+
+    def _load_shd(self, fname_base, complex64=False, out=None):
+        pressure, freq, tx_depth, rx_depth, rx_range = load_shd(fname_base+'.shd', complex64 or out is not None)
+        pressure = pressure.reshape(-1, len(rx_range))
+        if out is not None:
+            return TransmissionLossFile._write(out, pressure, freq, tx_depth, rx_depth, rx_range, _np.complex64 if complex64 else _np.complex128)
+        return _pd.DataFrame(pressure, index=_shd_index(freq, tx_depth, rx_depth), columns=rx_range)
+
+### Image method propagation model ###
+
+class _ImageMethod:
+
+    # results are computed faster than they can be loaded from the cache
+    cacheable = False
+
+    # arrivals with a combined reflection loss beyond this are dropped (-100 dB)
+    min_reflection = 1e-5
+
+    def __init__(self):
+        pass
+
+    def supports(self, env=None, task=None):
+        if env is None:
+            return task is None or task == arrivals
+        if task is not None and task != arrivals:
+            return False
+        return (env['type'] == '2D' and _np.size(env['soundspeed']) == 1 and _np.size(env['depth']) == 1
+            and env['surface'] is None and env['tx_directionality'] is None and env['bottom_roughness'] == 0)
+
+    def version(self):
+        return '1'
+
+    def run(self, env, task, debug=False, timeout=None, cancel=None, stats=None, **kwargs):
+        if task != arrivals:
+            raise ValueError('Image method only supports arrivals')
+        t = _time.perf_counter()
+        results = self._arrivals(env)
+        if stats is not None:
+            stats['run_wall_time'] = _time.perf_counter() - t
+        return results
 
+    def _images(self, depth, max_images):
+        # receiver images are at 2kD+z and 2kD-z, and an unfolded path from the source to
+        # an image crosses the surface and bottom the given number of times
+        k = _np.arange(-max_images, max_images+1)
+        sign = _np.concatenate((_np.ones(len(k)), -_np.ones(len(k))))
+        k = _np.concatenate((k, k))
+        sb = _np.where(sign > 0, _np.abs(k), _np.where(k > 0, k-1, 1-k))
+        return 2*depth*k, sign, sb, _np.abs(k)
+
+    def _arrivals(self, env):
+        c = float(env['soundspeed'])
+        depth = float(env['depth'])
+        tx_depth = _np.atleast_1d(_np.asarray(env['tx_depth'], dtype=_np.float64))
+        rx_depth = _np.atleast_1d(_np.asarray(env['rx_depth'], dtype=_np.float64))
+        rx_range = _np.atleast_1d(_np.asarray(env['rx_range'], dtype=_np.float64))
+        min_angle = _np.deg2rad(env['min_angle'])
+        max_angle = _np.deg2rad(env['max_angle'])
+        # only images within the angular limits at the farthest receiver can contribute
+        steepest = min(max(abs(min_angle), abs(max_angle)), _np.deg2rad(89.9))
+        max_images = int(_np.ceil((_np.max(rx_range)*_np.tan(steepest) + 2*depth)/(2*depth)))
+        offset, sign, sb, bb = self._images(depth, max_images)
+        rho1 = env['bottom_density']
+        c1 = env['bottom_soundspeed']
+        alpha = env['bottom_absorption']/(40*_np.pi*_np.log10(_np.e))
+        cols = [[] for j in range(10)]
+        for j in range(tx_depth.size):
+            for k in range(rx_depth.size):
+                z = offset + sign*rx_depth[k] - tx_depth[j]
+                # drop images that are too steep or too weak even at the farthest receiver,
+                # where paths are shallowest and reflection losses smallest
+                a = _np.arctan2(z, _np.max(rx_range))
+                r = _np.abs(_uwa.reflection_coeff(_np.pi/2-_np.abs(a), rho1, c1, alpha, rho=1000, c=c))**bb
+                ndx = _np.nonzero((a >= min_angle) & (a <= max_angle) & (r >= self.min_reflection))[0]
+                z = z[ndx]
+                dz = _np.broadcast_to(z, (rx_range.size, z.size))
+                dr = _np.broadcast_to(rx_range[:,None], dz.shape)
+                aod = _np.arctan2(dz, dr)
+                valid = (aod >= min_angle) & (aod <= max_angle)
+                m, n = _np.nonzero(valid)
+                dz = dz[m, n]
+                dr = dr[m, n]
+                aod = aod[m, n]
+                n = ndx[n]
+                rb = _uwa.reflection_coeff(_np.pi/2-_np.abs(aod), rho1, c1, alpha, rho=1000, c=c)**bb[n]
+                strong = _np.abs(rb) >= self.min_reflection
+                m, n, dz, dr, aod, rb = m[strong], n[strong], dz[strong], dr[strong], aod[strong], rb[strong]
+                dist = _np.hypot(dr, dz)
+                amp = (-1.0)**sb[n] * rb * _uwa.absorption(env['frequency'], dist) / _np.maximum(dist, 1.0)
+                # the vertical direction is reversed once by each reflection
+                aoa = _np.where(sign[n] > 0, aod, -aod)
+                tt = dist/c
+                order = _np.lexsort((tt, m))
+                m = m[order]
+                counts = _np.bincount(m, minlength=rx_range.size)
+                cols[0].append(_np.full(m.size, j))
+                cols[1].append(_np.full(m.size, k))
+                cols[2].append(m)
+                cols[3].append(_np.arange(m.size) - _np.repeat(_np.cumsum(counts)-counts, counts))
+                cols[4].append(_np.asarray(amp, dtype=_np.complex128)[order])
+                cols[5].append(tt[order])
+                cols[6].append(_np.rad2deg(aod[order]))
+                cols[7].append(_np.rad2deg(aoa[order]))
+                cols[8].append(sb[n][order])
+                cols[9].append(bb[n][order])
+        tx_depth_ndx, rx_depth_ndx, rx_range_ndx, arrival_number, amp, tt, aod, aoa, sbc, bbc = [_np.concatenate(x) for x in cols]
+        return _pd.DataFrame({
+            'tx_depth_ndx': tx_depth_ndx.astype(_np.int64),
+            'rx_depth_ndx': rx_depth_ndx.astype(_np.int64),
+            'rx_range_ndx': rx_range_ndx.astype(_np.int64),
+            'tx_depth': tx_depth[tx_depth_ndx],
+            'rx_depth': rx_depth[rx_depth_ndx],
+            'rx_range': rx_range[rx_range_ndx],
+            'arrival_number': arrival_number.astype(_np.int64),
+            'arrival_amplitude': amp,
+            'time_of_arrival': tt,
+            'angle_of_departure': aod,
+            'angle_of_arrival': aoa,
+            'surface_bounces': sbc.astype(_np.int64),
+            'bottom_bounces': bbc.astype(_np.int64)
+        }, index=_np.arange(1, len(tt)+1))
+
+_models.append(('image', _ImageMethod))
 _models.append(('bellhop', _Bellhop))
@@ -0,0 +1,167 @@
+##############################################################################
+#
+# Copyright (c) 2016, Mandar Chitre
+#
+# This file is part of arlpy which is released under Simplified BSD License.
+# See file LICENSE or go to http://www.opensource.org/licenses/BSD-3-Clause
+# for full license details.
+#
+##############################################################################
+
+"""Benchmark of the uwapm model output parsers, input file writer and
+sound speed profile simplification.
+
+Synthetic model output of increasing size is generated with the Bellhop
+stand-in (see tests/fake_bellhop.py), so no Bellhop installation is needed.
+
+Usage::
+
+    python -m tests.benchmark [--quick] [--save FILE] [--compare FILE] [--tolerance X]
+
+With `--save`, timings are written to a JSON file. With `--compare`, timings
+are checked against a previously saved file, and the benchmark fails if any
+case is more than `--tolerance` times (default 2) slower.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+from .context import uwapm
+from . import fake_bellhop
+
+def _time(func, repeat):
+    best = None
+    for j in range(repeat):
+        t = time.perf_counter()
+        func()
+        t = time.perf_counter() - t
+        if best is None or t < best:
+            best = t
+    return best
+
+def bench_arrivals(tmpdir, sizes, repeat):
+    model = uwapm._Bellhop()
+    fname_base = os.path.join(tmpdir, 'bench')
+    for nrd, nrr, narr in sizes:
+        fake_bellhop.write_arr(fname_base+'.arr', 25000, [10.0], np.linspace(1, 20, nrd), np.linspace(100, 1000, nrr), narr)
+        yield 'load_arrivals %dx%d receivers, %d arrivals' % (nrd, nrr, narr), _time(lambda: model._load_arrivals(fname_base), repeat)
+
+def bench_rays(tmpdir, sizes, repeat):
+    model = uwapm._Bellhop()
+    fname_base = os.path.join(tmpdir, 'bench')
+    for nrays, npts in sizes:
+        fake_bellhop.write_ray(fname_base+'.ray', 25000, 10.0, 25.0, 1000.0, nrays, npts)
+        yield 'load_rays %d rays, %d points' % (nrays, npts), _time(lambda: model._load_rays(fname_base), repeat)
+
+def bench_shd(tmpdir, sizes, repeat):
+    model = uwapm._Bellhop()
+    fname_base = os.path.join(tmpdir, 'bench')
+    for nrd, nrr in sizes:
+        fake_bellhop.write_shd(fname_base+'.shd', 25000, [10.0], np.linspace(0, 25, nrd), np.linspace(0, 1000, nrr))
+        yield 'load_shd %dx%d' % (nrd, nrr), _time(lambda: model._load_shd(fname_base), repeat)
+
+def bench_env(tmpdir, sizes, repeat):
+    model = uwapm._Bellhop()
+    workspace = uwapm._workspace['path']
+    uwapm.set_workspace(tmpdir)
+    try:
+        for nrr in sizes:
+            env = uwapm.create_env2d(rx_depth=np.linspace(1, 20, 100), rx_range=np.linspace(1, 1000, nrr))
+            def write():
+                uwapm._workspace_cleanup(model._create_env_file(env, 'A'))
+            def write_cold():
+                uwapm._sections.clear()
+                write()
+            yield 'create_env_file %d ranges' % (nrr), _time(write_cold, repeat)
+            yield 'create_env_file %d ranges (sweep)' % (nrr), _time(write, repeat)
+    finally:
+        uwapm.set_workspace(workspace)
+
+def bench_ssp(tmpdir, sizes, repeat):
+    model = uwapm._Bellhop()
+    workspace = uwapm._workspace['path']
+    cache = uwapm._cache['enabled']
+    uwapm.set_workspace(tmpdir)
+    uwapm.set_cache(False)
+    # model runs are only timed if Bellhop is installed
+    bellhop = 'bellhop' in uwapm.models()
+    try:
+        for npts in sizes:
+            z = np.linspace(0, 100, npts)
+            env = uwapm.create_env2d(depth=100, soundspeed=np.column_stack((z, 1500+20*np.exp(-z/20)+0.5*np.sin(z/3))), rx_depth=np.linspace(1, 99, 50), rx_range=np.linspace(100, 2000, 50))
+            yield 'simplify_ssp %d points' % (npts), _time(lambda: uwapm.simplify_ssp(env, tolerance=0.05), repeat)
+            env1 = uwapm.simplify_ssp(env, tolerance=0.05)[0]
+            for name, e in [('raw', env), ('simplified', env1)]:
+                yield 'create_env_file %d point ssp (%s)' % (npts, name), _time(lambda: uwapm._workspace_cleanup(model._create_env_file(e, 'A')), repeat)
+                if bellhop:
+                    yield 'compute_arrivals %d point ssp (%s)' % (npts, name), _time(lambda: uwapm.compute_arrivals(e, model='bellhop'), repeat)
+    finally:
+        uwapm.set_workspace(workspace)
+        uwapm.set_cache(cache)
+
+def run(quick=False):
+    """Run all benchmarks.
+
+    :param quick: True to only run small cases
+    :returns: dictionary of benchmark timings (s)
+    """
+    repeat = 3
+    cases = [
+        (bench_arrivals, [(10, 10, 10), (50, 50, 20), (100, 200, 20)]),
+        (bench_rays, [(100, 100), (1000, 500), (2000, 1000)]),
+        (bench_shd, [(100, 100), (500, 1000), (1000, 5000)]),
+        (bench_env, [100, 10000, 100000]),
+        (bench_ssp, [1000, 10000, 100000])
+    ]
+    results = {}
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for func, sizes in cases:
+            for name, t in func(tmpdir, sizes[:1] if quick else sizes, repeat):
+                results[name] = t
+                print('%-50s %10.2f ms' % (name, 1000*t))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return results
+
+def compare(results, baseline, tolerance):
+    """Compare benchmark timings against a baseline.
+
+    :param results: dictionary of benchmark timings (s)
+    :param baseline: dictionary of baseline timings (s)
+    :param tolerance: maximum allowed slowdown factor
+    :returns: list of names of benchmarks that regressed
+    """
+    regressed = []
+    for name, t in results.items():
+        if name in baseline and t > tolerance*baseline[name]:
+            print('REGRESSION: %s took %0.2f ms (baseline %0.2f ms)' % (name, 1000*t, 1000*baseline[name]))
+            regressed.append(name)
+    return regressed
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Benchmark uwapm parsers and writers')
+    parser.add_argument('--quick', action='store_true', help='only run small cases')
+    parser.add_argument('--save', help='save timings to JSON file')
+    parser.add_argument('--compare', help='compare timings against JSON file')
+    parser.add_argument('--tolerance', type=float, default=2.0, help='maximum allowed slowdown factor')
+    args = parser.parse_args(args)
+    results = run(args.quick)
+    if args.save is not None:
+        with open(args.save, 'wt') as f:
+            json.dump(results, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare, 'rt') as f:
+            baseline = json.load(f)
+        if len(compare(results, baseline, args.tolerance)) > 0:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
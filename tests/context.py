@@ -8,3 +8,4 @@ from arlpy import geo
 from arlpy import uwa
 from arlpy import signal
 from arlpy import comms
+from arlpy import uwapm
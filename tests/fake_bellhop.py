@@ -0,0 +1,166 @@
+##############################################################################
+#
+# Copyright (c) 2016, Mandar Chitre
+#
+# This file is part of arlpy which is released under Simplified BSD License.
+# See file LICENSE or go to http://www.opensource.org/licenses/BSD-3-Clause
+# for full license details.
+#
+##############################################################################
+
+"""Stand-in for the Bellhop executable, writing synthetic model output.
+
+The stand-in reads the transmitter and receiver grid from a Bellhop .env file
+and writes a synthetic .arr, .ray or .shd file for the requested task, so that
+the uwapm parsers can be tested and benchmarked without the Acoustics Toolbox.
+The size of the output is controlled by environment variables:
+
+- `FAKE_BELLHOP_ARRIVALS`: maximum number of arrivals per receiver (default 10)
+- `FAKE_BELLHOP_RAYS`: number of rays (default 100)
+- `FAKE_BELLHOP_POINTS`: maximum number of points per ray (default 100)
+- `FAKE_BELLHOP_SEED`: random seed (default 0)
+
+The directory `tests/bin` holds an executable `bellhop.exe` that runs the
+stand-in, and may be placed on the `PATH` to use it in place of Bellhop.
+"""
+
+import os
+import sys
+import struct
+import numpy as np
+
+def read_env(filename):
+    """Read the task, frequency and transmitter/receiver grid from a .env file.
+
+    :param filename: name of .env file
+    :returns: dictionary with task code, frequency, depth and grid (depths in m, ranges in m)
+    """
+    with open(filename, 'rt') as f:
+        lines = [s.strip() for s in f.readlines()]
+    if len(lines) == 0:
+        raise ValueError('Empty environment file')
+    env = {'frequency': float(lines[1]), 'depth': float(lines[4].split()[2])}
+    pos = 5
+    while not lines[pos].startswith("'A"):
+        pos += 1
+    pos += 2
+    grid = []
+    for j in range(3):
+        n = int(lines[pos])
+        grid.append(np.array(lines[pos+1].rstrip('/').split(), dtype=np.float64)[:n])
+        pos += 2
+    env['tx_depth'], env['rx_depth'], env['rx_range'] = grid[0], grid[1], 1000*grid[2]
+    env['task'] = lines[pos].strip("'")[0]
+    return env
+
+def write_arr(filename, frequency, tx_depth, rx_depth, rx_range, narr=10, seed=0):
+    """Write a synthetic .arr file.
+
+    :param filename: name of .arr file
+    :param frequency: frequency (Hz)
+    :param tx_depth: transmitter depths (m)
+    :param rx_depth: receiver depths (m)
+    :param rx_range: receiver ranges (m)
+    :param narr: maximum number of arrivals per receiver
+    :param seed: random seed
+    :returns: number of arrivals for each (tx_depth, rx_depth, rx_range)
+    """
+    rng = np.random.RandomState(seed)
+    ntx, nrd, nrr = len(tx_depth), len(rx_depth), len(rx_range)
+    counts = rng.randint(0, narr+1, size=(ntx, nrd, nrr))
+    s = ['%0.4f %d %d %d\n' % (frequency, ntx, nrd, nrr)]
+    s += [' '.join(['%0.4f' % x for x in a])+'\n' for a in [tx_depth, rx_depth, rx_range]]
+    for j in range(ntx):
+        s.append('%d\n' % (narr))
+        for k in range(nrd):
+            for m in range(nrr):
+                c = counts[j, k, m]
+                s.append('%d\n' % (c))
+                a = rng.uniform(size=(c, 6))
+                t = np.hypot(rx_range[m], rx_depth[k]-tx_depth[j])/1500 * (1+a[:,2]/10)
+                rows = np.column_stack((a[:,0]/1000, a[:,1]*360-180, t, np.zeros(c), a[:,3]*80-40, a[:,4]*80-40, np.floor(a[:,5]*5), np.floor(a[:,5]*7)))
+                s.append(('%0.6e %0.4f %0.6e %0.1f %0.4f %0.4f %d %d\n'*c) % tuple(rows.ravel().tolist()))
+    with open(filename, 'wt') as f:
+        f.write(''.join(s))
+    return counts
+
+def write_ray(filename, frequency, tx_depth, depth, max_range, nrays=100, npts=100, seed=0):
+    """Write a synthetic .ray file.
+
+    :param filename: name of .ray file
+    :param frequency: frequency (Hz)
+    :param tx_depth: transmitter depth (m)
+    :param depth: water depth (m)
+    :param max_range: maximum range of rays (m)
+    :param nrays: number of rays
+    :param npts: maximum number of points per ray
+    :param seed: random seed
+    :returns: number of points in each ray
+    """
+    rng = np.random.RandomState(seed)
+    counts = rng.randint(2, max(npts, 2)+1, size=nrays)
+    s = ["'arlpy'\n%0.4f\n1 1 1\n%0.4f\n%d\n0.0 %0.4f\n'rz'\n" % (frequency, tx_depth, nrays, depth)]
+    for a, n in zip(np.linspace(-80, 80, nrays), counts):
+        s.append('%0.4f\n%d %d %d\n' % (a, n, rng.randint(0, 5), rng.randint(0, 5)))
+        pts = np.column_stack((np.linspace(0, max_range, n), rng.uniform(0, depth, size=n)))
+        s.append(('%0.4f %0.4f\n'*n) % tuple(pts.ravel().tolist()))
+    with open(filename, 'wt') as f:
+        f.write(''.join(s))
+    return counts
+
+def write_shd(filename, frequency, tx_depth, rx_depth, rx_range, recl=None, seed=0):
+    """Write a synthetic .shd file.
+
+    :param filename: name of .shd file
+    :param frequency: frequencies (Hz)
+    :param tx_depth: transmitter depths (m)
+    :param rx_depth: receiver depths (m)
+    :param rx_range: receiver ranges (m)
+    :param recl: record length in 4-byte words (None for the smallest valid length)
+    :param seed: random seed
+    :returns: complex pressure[frequency, tx_depth, rx_depth, rx_range]
+    """
+    rng = np.random.RandomState(seed)
+    frequency = np.atleast_1d(frequency)
+    nfreq, nsd, nrd, nrr = len(frequency), len(tx_depth), len(rx_depth), len(rx_range)
+    if recl is None:
+        recl = max(2*nrr, nfreq, nsd, nrd, 21)
+    shape = (nfreq, nsd, nrd, nrr)
+    p = (rng.normal(size=shape) + 1j*rng.normal(size=shape)).astype(np.complex64)
+    rec = [struct.pack('i', recl)+b"'arlpy'", b'rectilin  ', struct.pack('iiiiiiif', nfreq, 1, 1, 1, nsd, nrd, nrr, 0.0),
+           struct.pack('f'*nfreq, *frequency), b'', b'', b'', struct.pack('f'*nsd, *tx_depth),
+           struct.pack('f'*nrd, *rx_depth), struct.pack('f'*nrr, *rx_range)]
+    rec += [x.tobytes() for x in p.reshape(-1, nrr)]
+    data = b''.join([x.ljust(4*recl, b'\0') for x in rec])
+    with open(filename, 'wb') as f:
+        # the last record is not padded
+        f.write(data[:len(data)-4*recl+8*nrr])
+    return p
+
+def main(args):
+    if len(args) < 2:
+        sys.stderr.write('usage: bellhop.exe <filename-without-extension>\n')
+        return 1
+    fname_base = args[1]
+    if os.path.exists(fname_base+'.env') and os.path.getsize(fname_base+'.env') == 0:
+        # empty environment file used to probe for the executable
+        return 1
+    try:
+        env = read_env(fname_base+'.env')
+    except (OSError, ValueError, IndexError) as e:
+        sys.stderr.write('bellhop.exe: '+str(e)+'\n')
+        return 1
+    seed = int(os.environ.get('FAKE_BELLHOP_SEED', '0'))
+    if env['task'] == 'A':
+        narr = int(os.environ.get('FAKE_BELLHOP_ARRIVALS', '10'))
+        write_arr(fname_base+'.arr', env['frequency'], env['tx_depth'], env['rx_depth'], env['rx_range'], narr, seed)
+    elif env['task'] in 'ER':
+        nrays = int(os.environ.get('FAKE_BELLHOP_RAYS', '100'))
+        npts = int(os.environ.get('FAKE_BELLHOP_POINTS', '100'))
+        write_ray(fname_base+'.ray', env['frequency'], env['tx_depth'][0], env['depth'], np.max(env['rx_range']), nrays, npts, seed)
+    else:
+        write_shd(fname_base+'.shd', env['frequency'], env['tx_depth'], env['rx_depth'], env['rx_range'], seed=seed)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
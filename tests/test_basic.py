@@ -8,11 +8,21 @@
 #
 ##############################################################################
 
+import os
+import asyncio
+import threading
+import tracemalloc
+import concurrent.futures
 import unittest
+import tempfile
+import shutil
 import numpy as np
+import pandas as pd
 import scipy.signal as sp
+import scipy.interpolate as interpolate
 
-from .context import utils, geo, uwa, signal, comms
+from .context import utils, geo, uwa, signal, comms, uwapm
+from . import fake_bellhop
 
 class MyTestCase(unittest.TestCase):
 
@@ -354,5 +364,744 @@ class CommsTestSuite(MyTestCase):
         self.assertArrayEqual(d.real, np.zeros_like(d, dtype=np.float), precision=1)
         self.assertArrayEqual(d.imag, np.zeros_like(d, dtype=np.float), precision=1)
 
+class CountingModel:
+
+    runs = 0
+
+    def supports(self, env=None, task=None):
+        return True
+
+    def version(self):
+        return '1'
+
+    def run(self, env, task, debug=False, **kwargs):
+        CountingModel.runs += 1
+        return pd.DataFrame({'rx_range': [env['rx_range']], 'task': [task]})
+
+class BeamModel:
+
+    runs = []
+
+    def supports(self, env=None, task=None):
+        return True
+
+    def version(self):
+        return '1'
+
+    def run(self, env, task, debug=False, **kwargs):
+        # level error falls as the number of beams grows
+        BeamModel.runs.append(env['nbeams'])
+        nrd, nrr = np.size(env['rx_depth']), np.size(env['rx_range'])
+        amp = np.sqrt(1 + 10/env['nbeams']) * np.ones((nrd, nrr))
+        if task == uwapm.arrivals:
+            ndx = np.indices((nrd, nrr))
+            return pd.DataFrame({'rx_depth_ndx': ndx[0].ravel(), 'rx_range_ndx': ndx[1].ravel(), 'arrival_amplitude': amp.ravel()})
+        return pd.DataFrame(amp)
+
+class UwapmTestSuite(MyTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        # tests may add models, reconfigure the cache or patch the fake models, so module state is restored after each
+        self.saved_models = list(uwapm._models)
+        self.saved_cache = dict(uwapm._cache)
+        self.saved_run = CountingModel.run
+        uwapm.set_cache(False)
+        CountingModel.runs = 0
+
+    def tearDown(self):
+        uwapm._models[:] = self.saved_models
+        uwapm._cache.update(self.saved_cache)
+        CountingModel.run = self.saved_run
+        uwapm.set_timeout(None)
+        uwapm.set_stats_hook(None)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_load_arrivals(self):
+        fname_base = os.path.join(self.tmpdir, 'test')
+        with open(fname_base+'.arr', 'wt') as f:
+            f.write('25000.0 1 2 2\n5.0\n10.0 20.0\n0.5 1.0\n2\n')
+            f.write('1\n0.1 0.0 0.33 0.0 5.0 -5.0 0 0\n')
+            f.write('0\n')
+            f.write('2\n0.2 90.0 0.34 0.0 6.0 -6.0 1 0\n0.3 45.0 0.35 0.0 -7.0 7.0 0 1\n')
+            f.write('1\n0.4 0.0 0.67 0.0 8.0 -8.0 1 1\n')
+        a = uwapm._Bellhop()._load_arrivals(fname_base)
+        self.assertEqual(len(a), 4)
+        self.assertArrayEqual(a.index, [1, 2, 3, 4])
+        self.assertArrayEqual(a.rx_depth_ndx, [0, 1, 1, 1])
+        self.assertArrayEqual(a.rx_range_ndx, [0, 0, 0, 1])
+        self.assertArrayEqual(a.rx_depth, [10.0, 20.0, 20.0, 20.0])
+        self.assertArrayEqual(a.rx_range, [0.5, 0.5, 0.5, 1.0])
+        self.assertArrayEqual(a.arrival_number, [0, 0, 1, 0])
+        self.assertArrayEqual(a.time_of_arrival, [0.33, 0.34, 0.35, 0.67])
+        self.assertArrayEqual(a.angle_of_departure, [5.0, 6.0, -7.0, 8.0])
+        self.assertArrayEqual(a.surface_bounces, [0, 1, 0, 1])
+        self.assertArrayEqual(a.bottom_bounces, [0, 0, 1, 1])
+        self.assertArrayEqual(a.arrival_amplitude, [0.1, 0.2*np.exp(90j), 0.3*np.exp(45j), 0.4])
+
+    def test_load_rays(self):
+        fname_base = os.path.join(self.tmpdir, 'test')
+        with open(fname_base+'.ray', 'wt') as f:
+            f.write("'arlpy'\n25000.0\n1 1 1\n0.0\n2\n0.0 0.0\n'rz'\n")
+            f.write('-10.0\n3 1 0\n0.0 5.0\n10.0 3.0\n20.0 1.0\n')
+            f.write('10.0\n2 0 2\n0.0 5.0\n10.0 7.0\n')
+        r = uwapm._Bellhop()._load_rays(fname_base)
+        self.assertEqual(len(r), 2)
+        self.assertArrayEqual(r.angle_of_departure, [-10.0, 10.0])
+        self.assertArrayEqual(r.surface_bounces, [1, 0])
+        self.assertArrayEqual(r.bottom_bounces, [0, 2])
+        self.assertArrayEqual(r.ray[0], [[0, 5], [10, 3], [20, 1]])
+        self.assertArrayEqual(r.ray[1], [[0, 5], [10, 7]])
+        self.assertIs(r.ray[0].base, r.ray[1].base)
+
+    def write_shd(self, filename, nfreq, nsd, nrd, nrr, recl=16):
+        return fake_bellhop.write_shd(filename, np.linspace(1000, 2000, nfreq), np.linspace(5, 15, nsd), np.arange(nrd)*10.0, np.arange(nrr)*100.0, recl=recl, seed=np.random.randint(1000))
+
+    def test_load_shd(self):
+        fname_base = os.path.join(self.tmpdir, 'test')
+        p = self.write_shd(fname_base+'.shd', 2, 3, 4, 5)
+        pressure, freq, tx_depth, rx_depth, rx_range = uwapm.load_shd(fname_base+'.shd')
+        self.assertEqual(pressure.dtype, np.complex128)
+        self.assertArrayEqual(pressure, p)
+        self.assertArrayEqual(freq, [1000, 2000])
+        self.assertArrayEqual(tx_depth, [5, 10, 15])
+        self.assertArrayEqual(rx_depth, [0, 10, 20, 30])
+        self.assertArrayEqual(rx_range, [0, 100, 200, 300, 400])
+        pressure = uwapm.load_shd(fname_base+'.shd', complex64=True)[0]
+        self.assertEqual(pressure.dtype, np.complex64)
+        self.assertArrayEqual(pressure, p)
+        tloss = uwapm._Bellhop()._load_shd(fname_base)
+        self.assertEqual(tloss.index.names, ['frequency', 'tx_depth', 'rx_depth'])
+        self.assertArrayEqual(tloss.loc[(2000, 10)], p[1, 1])
+        del pressure, tloss
+
+    def test_transmission_loss_file(self):
+        fname_base = os.path.join(self.tmpdir, 'test')
+        p = self.write_shd(fname_base+'.shd', 1, 1, 4, 5)
+        tloss = uwapm._Bellhop()._load_shd(fname_base, out=os.path.join(self.tmpdir, 'tloss.npy'))
+        self.assertEqual(tloss.shape, (4, 5))
+        self.assertEqual(tloss.dtype, np.complex128)
+        self.assertArrayEqual(tloss.index, [0, 10, 20, 30])
+        self.assertArrayEqual(tloss.columns, [0, 100, 200, 300, 400])
+        self.assertArrayEqual(tloss[1,:], p[0,0,1,:])
+        tloss = uwapm.TransmissionLossFile(os.path.join(self.tmpdir, 'tloss.npy'))
+        self.assertArrayEqual(np.array(tloss), p[0,0])
+        df = tloss.to_frame()
+        self.assertArrayEqual(df.loc[20.0], p[0,0,2,:])
+        del tloss
+
+    def test_impulse_response(self):
+        arrivals = pd.DataFrame({
+            'tx_depth_ndx': [0, 0, 0, 0],
+            'rx_depth_ndx': [0, 0, 0, 1],
+            'rx_range_ndx': [0, 0, 0, 0],
+            'arrival_amplitude': [1.0, 0.5j, 0.25, -1.0],
+            'time_of_arrival': [0.5, 0.502, 0.502, 0.501]
+        })
+        ir = uwapm.arrivals_to_impulse_response(arrivals.iloc[:3], fs=1000)
+        self.assertArrayEqual(ir, [1.0, 0, 0.25+0.5j], precision=12)
+        ir = uwapm.arrivals_to_impulse_response(arrivals.iloc[:3], fs=1000, abs_time=True)
+        self.assertEqual(len(ir), 503)
+        self.assertArrayEqual(ir[500:], [1.0, 0, 0.25+0.5j], precision=12)
+        ir = uwapm.arrivals_to_impulse_response(arrivals.iloc[:3], fs=1000, width=4)
+        self.assertArrayEqual(ir[:10], [0, 0, 0, 0, 1.0, 0, 0.25+0.5j, 0, 0, 0], precision=12)
+        ir = uwapm.arrivals_to_impulse_response(pd.DataFrame({'arrival_amplitude': [1.0], 'time_of_arrival': [0.0105]}), fs=1000, abs_time=True, width=4)
+        self.assertEqual(len(ir), 15)
+        self.assertArrayEqual(ir[:7], np.zeros(7))
+        self.assertArrayEqual(ir[7:11], ir[14:10:-1], precision=12)
+        self.assertGreater(np.abs(ir[10]), 0.6)
+        ir = uwapm.arrivals_to_impulse_responses(arrivals, fs=1000)
+        self.assertEqual(ir.shape, (2, 3))
+        self.assertEqual(list(ir.index), [(0, 0, 0), (0, 1, 0)])
+        self.assertArrayEqual(ir.loc[(0, 1, 0)], [0, -1.0, 0], precision=12)
+
+    def test_frequency_response(self):
+        arrivals = pd.DataFrame({
+            'tx_depth_ndx': [0, 0, 0, 0],
+            'rx_depth_ndx': [0, 0, 1, 0],
+            'rx_range_ndx': [0, 0, 0, 1],
+            'arrival_amplitude': [0.7, 1j, -0.5+0.1j, 0.2],
+            'time_of_arrival': [0.011, 0.0152, 0.013, 0.9]
+        })
+        for f in [np.linspace(1000, 2000, 300), np.array([1000, 1500.5, 3000])]:
+            p = uwapm.arrivals_to_frequency_response(arrivals, f)
+            self.assertEqual(list(p.index), [(0, 0, 0), (0, 0, 1), (0, 1, 0)])
+            self.assertArrayEqual(p.columns, f)
+            self.assertArrayEqual(p.loc[(0, 0, 0)].values, 0.7*np.exp(-2j*np.pi*f*0.011) + 1j*np.exp(-2j*np.pi*f*0.0152), precision=9)
+            self.assertArrayEqual(p.loc[(0, 0, 1)].values, 0.2*np.exp(-2j*np.pi*f*0.9), precision=9)
+        # long uniform grid, where each block spans many re-seeded runs of the recurrence
+        f = 1000 + 0.5*np.arange(200000)
+        p = uwapm.arrivals_to_frequency_response(arrivals, f)
+        self.assertArrayEqual(p.loc[(0, 0, 0)].values, 0.7*np.exp(-2j*np.pi*f*0.011) + 1j*np.exp(-2j*np.pi*f*0.0152), precision=9)
+        self.assertArrayEqual(p.loc[(0, 0, 1)].values, 0.2*np.exp(-2j*np.pi*f*0.9), precision=9)
+        # many arrivals and few frequencies stay within the memory budget
+        n = 100000
+        t = np.linspace(0.01, 1, n)
+        many = pd.DataFrame({'tx_depth_ndx': np.zeros(n, dtype=int), 'rx_depth_ndx': np.arange(n) % 3, 'rx_range_ndx': np.zeros(n, dtype=int),
+            'arrival_amplitude': np.ones(n), 'time_of_arrival': t})
+        f = np.array([1000.0, 1000.5, 1001.0])
+        tracemalloc.start()
+        try:
+            p = uwapm.arrivals_to_frequency_response(many, f)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 100*1024*1024)
+        self.assertArrayEqual(p.loc[(0, 1, 0)].values, np.sum(np.exp(-2j*np.pi*np.outer(t[1::3], f)), axis=0), precision=6)
+        p = uwapm.arrivals_to_frequency_response(arrivals, 1000, mode=uwapm.incoherent)
+        self.assertEqual(p.shape, (3, 1))
+        self.assertApproxEqual(p.loc[(0, 0, 0)].iloc[0], np.sqrt(0.49+1), precision=12)
+        self.assertRaises(ValueError, uwapm.arrivals_to_frequency_response, arrivals, 1000, mode=uwapm.semicoherent)
+
+    def test_simplify_ssp(self):
+        z = np.linspace(0, 100, 2000)
+        ssp = np.column_stack((z, 1500+20*np.exp(-z/20)))
+        for interp in [uwapm.linear, uwapm.spline]:
+            env = uwapm.create_env2d(depth=100, soundspeed=ssp, soundspeed_interp=interp)
+            env1, err, terr = uwapm.simplify_ssp(env, tolerance=0.05)
+            self.assertLess(env1['soundspeed'].shape[0], 30)
+            self.assertLessEqual(err, 0.05)
+            self.assertEqual(env['soundspeed'].shape, (2000, 2))
+            uwapm.check_env2d(env1)
+            c = np.interp(z, env1['soundspeed'][:,0], env1['soundspeed'][:,1]) if interp == uwapm.linear else interpolate.splev(z, interpolate.splrep(env1['soundspeed'][:,0], env1['soundspeed'][:,1], s=0))
+            self.assertApproxEqual(np.max(np.abs(c-ssp[:,1])), err, precision=6)
+            env1, err, terr = uwapm.simplify_ssp(env, time_tolerance=1e-7)
+            self.assertLessEqual(terr, 1e-7)
+        env = uwapm.create_env2d(depth=30, soundspeed=[[0, 1500], [10, 1500], [20, 1500], [30, 1500], [40, 1500]])
+        env1, err, terr = uwapm.simplify_ssp(env, tolerance=0.1)
+        self.assertEqual(env1['soundspeed'].shape, (4, 2))
+        self.assertApproxEqual(err, 0, precision=9)
+        self.assertRaises(ValueError, uwapm.simplify_ssp, env)
+
+    def test_tune_env(self):
+        BeamModel.runs = []
+        uwapm._models.insert(0, ('beam', BeamModel))
+        env = uwapm.create_env2d(rx_depth=np.arange(0, 25, 1), rx_range=np.arange(100, 1000, 10))
+        env1, err = uwapm.tune_env(env, tolerance=0.3, model='beam')
+        self.assertEqual(env1['nbeams'], 200)
+        self.assertApproxEqual(err, 10*np.log10(1.05/1.002), precision=9)
+        self.assertEqual(BeamModel.runs, [5000, 100, 200])
+        self.assertEqual(env['nbeams'], 0)
+        self.assertEqual(env1['rx_range'].shape, (90,))
+        env1, err = uwapm.tune_env(env, task=uwapm.coherent, tolerance=0.01, settings=[{'nbeams': 100, 'step': 1}, {'nbeams': 1000, 'step': 0.5}], model='beam')
+        self.assertEqual((env1['nbeams'], env1['step']), (1000, 0.5))
+        self.assertEqual(err, 0)
+        self.assertRaises(ValueError, uwapm.tune_env, env, task=uwapm.rays, model='beam')
+
+    def test_moving_channel(self):
+        rows = []
+        for i, d in enumerate([10.0, 20.0]):
+            for j, r in enumerate([1000.0, 1100.0]):
+                rows.append((0, i, j, 5.0, d, r, 1, 1000/r, r/1500+d/1e4, 5.0, 5.0, 0, 0))
+                rows.append((0, i, j, 5.0, d, r, 2, -500/r, r/1500+0.01+d/1e4, -5.0, 5.0, 1, 0))
+        arrivals = pd.DataFrame(rows, columns=['tx_depth_ndx', 'rx_depth_ndx', 'rx_range_ndx', 'tx_depth', 'rx_depth', 'rx_range', 'arrival_number',
+            'arrival_amplitude', 'time_of_arrival', 'angle_of_departure', 'angle_of_arrival', 'surface_bounces', 'bottom_bounces'])
+        p = uwapm.track_arrivals(arrivals, [[0, 15, 1050], [10, 15, 1070]], frequency=10000)
+        self.assertEqual(p.shape, (4, 11))
+        self.assertArrayEqual(p.time_of_arrival.values, [1050/1500+0.0015, 1050/1500+0.0115, 1070/1500+0.0015, 1070/1500+0.0115], precision=12)
+        self.assertApproxEqual(p.arrival_amplitude.iloc[0].real, (1000/1000+1000/1100)/2, precision=12)
+        self.assertArrayEqual(p.radial_speed.values, -2*np.ones(4), precision=9)
+        self.assertApproxEqual(p.doppler_frequency.iloc[0], 10000*(1-2/1500), precision=6)
+        # static track matches a fixed channel, when applied in blocks
+        fs = 8000
+        track = [[0, 10, 1000], [100, 10, 1000]]
+        ch = uwapm.MovingChannel(arrivals, track, fs, width=4)
+        x = np.random.normal(0, 1, 4000)
+        y = np.concatenate([ch.apply(x[k:k+700]) for k in range(0, len(x), 700)])
+        self.assertArrayEqual(y, uwapm.simulate_channel(x, arrivals.iloc[:2], fs, width=4).iloc[0].values[:4000], precision=9)
+        ch = uwapm.MovingChannel(arrivals, track, fs, fc=1500, abs_time=True)
+        x = np.random.normal(0, 1, 4000) + 1j*np.random.normal(0, 1, 4000)
+        y = np.concatenate([ch.apply(x[k:k+700]) for k in range(0, len(x), 700)])
+        self.assertArrayEqual(y, uwapm.simulate_channel(x, arrivals.iloc[:2], fs, fc=1500, abs_time=True).iloc[0].values[:4000], precision=9)
+        # receiver opening range gives Doppler shift
+        t = np.arange(0, 3, 0.1)
+        track = np.column_stack((t, 15+0*t, 1000+5*t))
+        ch = uwapm.MovingChannel(arrivals[arrivals.surface_bounces == 0], track, fs, fc=1000)
+        y = ch.apply(np.ones(2*fs))[2000:]
+        ph = np.unwrap(np.angle(y))
+        self.assertApproxEqual(np.polyfit(np.arange(len(ph))/fs, ph, 1)[0]/(2*np.pi), -1000*5/1500, precision=3)
+        ch.reset()
+        self.assertArrayEqual(ch.apply(np.ones(2*fs))[2000:], y, precision=12)
+
+    def test_simulate_channel(self):
+        arrivals = pd.DataFrame({
+            'tx_depth_ndx': [0, 0, 0, 0],
+            'rx_depth_ndx': [0, 0, 1, 1],
+            'rx_range_ndx': [0, 0, 0, 0],
+            'arrival_amplitude': [1.0, -0.5, 0.7, 1j],
+            'time_of_arrival': [0.01, 0.0123, 0.011, 0.0152]
+        })
+        fs = 8000
+        ir = uwapm.arrivals_to_impulse_responses(arrivals.iloc[:2], fs)
+        x = np.random.normal(0, 1, 5000)
+        y = uwapm.simulate_channel(x, arrivals.iloc[:2], fs, nfft=64)
+        self.assertEqual(y.shape, (1, 5000+ir.shape[1]-1))
+        self.assertArrayEqual(y.loc[(0, 0, 0)], np.convolve(x, np.real(ir.loc[(0, 0, 0)])), precision=9)
+        x = signal.cw(1000, 0.5, fs)
+        y = uwapm.simulate_channel(x, arrivals, fs)
+        self.assertArrayEqual(y.loc[(0, 1, 0)][500:3000], 0.7*x[492:2992]+np.cos(2*np.pi*1000*signal.time(x, fs))[458:2958], precision=2)
+        x = np.random.normal(0, 1, 3000) + 1j*np.random.normal(0, 1, 3000)
+        y = uwapm.simulate_channel(x, arrivals, fs, fc=1500, nfft=256)
+        h1 = 0.7*np.exp(-2j*np.pi*1500*0.011)
+        h2 = 1j*np.exp(-2j*np.pi*1500*0.0152)
+        self.assertArrayEqual(y.loc[(0, 1, 0)][8:3008], h1*x + h2*np.append(np.zeros(34), x[:-34]), precision=9)
+
+    def test_model_probe(self):
+        calls = []
+        bellhop = uwapm._Bellhop._bellhop
+        uwapm._Bellhop._bellhop = lambda self, *args: calls.append(args) and False
+        try:
+            uwapm.invalidate_models()
+            self.assertEqual(uwapm.probe_models(), ['image'])
+            self.assertEqual(uwapm.models(), ['image'])
+            self.assertRaises(ValueError, uwapm.compute_rays, uwapm.create_env2d())
+            self.assertEqual(len(calls), 1)
+            uwapm.invalidate_models()
+            self.assertEqual(uwapm.models(), ['image'])
+            self.assertEqual(len(calls), 2)
+        finally:
+            uwapm._Bellhop._bellhop = bellhop
+            uwapm.invalidate_models()
+
+    def test_async(self):
+        uwapm._models.insert(0, ('counting', CountingModel))
+        async def queries():
+            envs = [uwapm.create_env2d(rx_range=r) for r in [500, 1000, 2000]]
+            return await asyncio.gather(*[uwapm.compute_arrivals_async(env, model='counting') for env in envs])
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(queries())
+            self.assertEqual(CountingModel.runs, 3)
+            self.assertEqual([r.rx_range[0] for r in results], [500, 1000, 2000])
+            tloss = loop.run_until_complete(uwapm.compute_transmission_loss_async(uwapm.create_env2d(), mode=uwapm.incoherent, model='counting'))
+            self.assertEqual(tloss.task[0], uwapm.incoherent)
+        finally:
+            loop.close()
+
+    def test_timeout(self):
+        exe = os.path.join(self.tmpdir, 'bellhop.exe')
+        with open(exe, 'w') as f:
+            f.write('#!/bin/sh\nsleep 10\n')
+        os.chmod(exe, 0o755)
+        path = os.environ['PATH']
+        os.environ['PATH'] = self.tmpdir + os.pathsep + path
+        try:
+            model = uwapm._Bellhop()
+            self.assertRaises(TimeoutError, model._bellhop, 'x', timeout=0.2)
+            cancel = threading.Event()
+            threading.Timer(0.2, cancel.set).start()
+            self.assertRaises(concurrent.futures.CancelledError, model._bellhop, 'x', cancel=cancel)
+            self.assertRaises(concurrent.futures.CancelledError, model._bellhop, 'x', cancel=cancel)
+            loop = asyncio.new_event_loop()
+            try:
+                self.assertRaises(TimeoutError, loop.run_until_complete, model._bellhop_async('x', timeout=0.2))
+            finally:
+                loop.close()
+        finally:
+            os.environ['PATH'] = path
+        uwapm._models.insert(0, ('counting', CountingModel))
+        run = CountingModel.run
+        def slow_run(self, env, task, debug=False, timeout=None, **kwargs):
+            if env['rx_range'] > 1000:
+                raise TimeoutError('Model run exceeded %s s' % timeout)
+            return run(self, env, task, debug, **kwargs)
+        CountingModel.run = slow_run
+        uwapm.set_timeout(5)
+        envs = [uwapm.create_env2d(rx_range=r) for r in [500, 2000, 1000]]
+        with self.assertWarns(UserWarning):
+            a = uwapm.compute_arrivals_batch(envs, model='counting')
+        self.assertEqual(list(a.index.get_level_values('env_ndx')), [0, 2])
+        self.assertRaises(TimeoutError, uwapm.compute_arrivals, envs[1], model='counting')
+
+    def test_batch_failures(self):
+        uwapm._models.insert(0, ('counting', CountingModel))
+        run = CountingModel.run
+        def failing_run(self, env, task, debug=False, **kwargs):
+            if env['rx_range'] == 2000:
+                raise FileNotFoundError('No output file')
+            if env['rx_range'] == 3000:
+                return None
+            if env['rx_range'] == 4000:
+                raise concurrent.futures.CancelledError('Cancelled')
+            return run(self, env, task, debug, **kwargs)
+        CountingModel.run = failing_run
+        envs = [uwapm.create_env2d(rx_range=r) for r in [500, 2000, 1000, 3000]]
+        with self.assertWarns(UserWarning) as w:
+            a = uwapm.compute_arrivals_batch(envs, model='counting')
+        self.assertEqual(list(a.index.get_level_values('env_ndx')), [0, 2])
+        self.assertEqual(sorted(str(x.message)[:13] for x in w.warnings), ['Environment 1', 'Environment 3'])
+        # cancellation still stops the whole batch
+        self.assertRaises(concurrent.futures.CancelledError, uwapm.compute_arrivals_batch, envs+[uwapm.create_env2d(rx_range=4000)], model='counting')
+
+    def test_env_file(self):
+        path = uwapm._workspace['path']
+        uwapm.set_workspace(self.tmpdir)
+        try:
+            model = uwapm._Bellhop()
+            fname_base = model._create_env_file(uwapm.create_env2d(rx_depth=[5, 10]), 'A')
+            with open(fname_base+'.env') as f:
+                self.assertEqual(f.read(), "'arlpy'\n25000.0000\n1\n'SVWT'\n1 0.0 25.0000\n0.0 1500.0000 /\n25.0000 1500.0000 /\n'A' 0.0000\n25.0000 1600.0000 0.0 1.6000 0.1000 /\n1\n5.0000 /\n2\n5.0000 10.0000 /\n1\n1.0000 /\n'A'\n0\n-80.0000 80.0000 /\n0.0 25.2500 1.0100\n")
+            env = uwapm.create_env2d(depth=[[0, 40], [1000, 30]], soundspeed=[[0, 1540], [10, 1530], [20, 1532], [40, 1535]], soundspeed_interp=uwapm.linear, rx_range=np.linspace(1, 1000, 1000), tx_directionality=np.array([[-90, 3], [0, 0], [90, 3]]))
+            fname_base = model._create_env_file(env, 'A')
+            with open(fname_base+'.env') as f:
+                lines = f.read().split('\n')
+            self.assertEqual(lines[3], "'CVWT'")
+            self.assertEqual(lines[5:9], ['0.0000 1540.0000 /', '10.0000 1530.0000 /', '20.0000 1532.0000 /', '40.0000 1535.0000 /'])
+            self.assertEqual(lines[9], "'A*' 0.0000")
+            self.assertEqual(lines[15], '1000')
+            self.assertEqual(lines[16].split()[:2], ['0.0010', '0.0020'])
+            self.assertEqual(lines[17], "'A *'")
+            with open(fname_base+'.bty') as f:
+                self.assertEqual(f.read(), "'L'\n2\n0.0000 40.0000\n1.0000 30.0000\n")
+            with open(fname_base+'.sbp') as f:
+                self.assertEqual(f.read(), "3\n-90.0000 3.0000\n0.0000 0.0000\n90.0000 3.0000\n")
+            env['tx_depth'] = 10
+            fname_base2 = model._create_env_file(env, 'A')
+            with open(fname_base2+'.env') as f:
+                lines2 = f.read().split('\n')
+            self.assertEqual(lines2[12], '10.0000 /')
+            self.assertEqual(lines2[16], lines[16])
+            env.update(nbeams=200, step=2.5, beam_type=uwapm.gaussian)
+            fname_base = model._create_env_file(env, 'A')
+            with open(fname_base+'.env') as f:
+                lines = f.read().split('\n')
+            self.assertEqual(lines[17:20], ["'AB*'", '200', '-80.0000 80.0000 /'])
+            self.assertEqual(lines[20].split()[0], '2.5000')
+            env['tx_directionality'] = None
+            self.assertRaises(ValueError, uwapm.check_env2d, dict(env, nbeams=-1))
+            self.assertRaises(ValueError, uwapm.check_env2d, dict(env, beam_type='hat'))
+        finally:
+            uwapm.set_workspace(path)
+
+    def test_workspace(self):
+        path = uwapm._workspace['path']
+        uwapm.set_workspace(os.path.join(self.tmpdir, 'ws'))
+        try:
+            self.assertEqual(uwapm.workspace_usage(), 0)
+            model = uwapm._Bellhop()
+            env = uwapm.create_env2d(depth=[[0, 40], [100, 30], [500, 35], [1000, 40]])
+            fname_base = model._create_env_file(env, 'A')
+            self.assertEqual(os.path.dirname(fname_base), os.path.join(self.tmpdir, 'ws', '%d-%d' % (os.getpid(), threading.get_ident())))
+            with open(fname_base+'.arr', 'w') as f:
+                f.write('x')
+            self.assertEqual(len(os.listdir(os.path.dirname(fname_base))), 3)
+            self.assertGreater(uwapm.workspace_usage(), 0)
+            model._cleanup(fname_base, False)
+            self.assertEqual(os.listdir(os.path.dirname(fname_base)), [])
+            self.assertEqual(uwapm.workspace_usage(), 0)
+            model._create_env_file(env, 'A')
+            uwapm.clear_workspace()
+            self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'ws')))
+        finally:
+            uwapm.set_workspace(path)
+
+    def test_sweep(self):
+        uwapm._models.insert(0, ('counting', CountingModel))
+        env = uwapm.create_env2d()
+        a = uwapm.sweep(env, uwapm.arrivals, model='counting', rx_range=[500, 1000, 500, 2000], tx_depth=[5, 10])
+        self.assertEqual(CountingModel.runs, 6)
+        self.assertEqual(a.index.names[:2], ['rx_range', 'tx_depth'])
+        self.assertEqual(a.loc[(2000, 10)].rx_range.iloc[0], 2000)
+        self.assertEqual(len(a.loc[500]), 2)
+        tloss = uwapm.sweep(env, uwapm.incoherent, model='counting', rx_range=[np.array([100, 200]), np.array([300, 400])])
+        self.assertEqual(list(tloss.index.get_level_values(0)), [0, 1])
+        self.assertEqual(list(tloss.task), [uwapm.incoherent]*2)
+        ssp = [[0, 1500], [10, 1501], [20, 1502], [40, 1503]]
+        a = uwapm.sweep(env, uwapm.arrivals, model='counting', soundspeed=[ssp, 1500, ssp])
+        self.assertEqual(list(a.index.get_level_values(0)), [0, 1])
+        self.assertEqual(CountingModel.runs, 10)
+        self.assertRaises(KeyError, uwapm.sweep, env, uwapm.arrivals, model='counting', rx_rnage=[500])
+        self.assertRaises(ValueError, uwapm.sweep, env, 'arrival', model='counting', rx_range=[500])
+
+    def test_query_planner(self):
+        uwapm._models.insert(0, ('counting', CountingModel))
+        def grid_run(self, env, task, debug=False, **kwargs):
+            CountingModel.runs += 1
+            tx = np.atleast_1d(env['tx_depth'])
+            rd = np.atleast_1d(env['rx_depth'])
+            rr = np.atleast_1d(env['rx_range'])
+            ndx = np.array([(i, j, k, n) for i in range(tx.size) for j in range(rd.size) for k in range(rr.size) for n in range(2)])
+            return pd.DataFrame({
+                'tx_depth_ndx': ndx[:,0], 'rx_depth_ndx': ndx[:,1], 'rx_range_ndx': ndx[:,2],
+                'tx_depth': tx[ndx[:,0]], 'rx_depth': rd[ndx[:,1]], 'rx_range': rr[ndx[:,2]], 'arrival_number': ndx[:,3]
+            })
+        CountingModel.run = grid_run
+        with uwapm.QueryPlanner(uwapm.create_env2d(), model='counting') as planner:
+            queries = [(5, 10, 1000), (10, 10, 500), (5, 20, 1000), (5, 10, 1000)]
+            futures = [planner.submit(*q) for q in queries]
+            cancelled = planner.submit(5, 15, 800)
+            self.assertTrue(cancelled.cancel())
+            self.assertEqual(len(planner), 5)
+            self.assertFalse(futures[0].done())
+        self.assertEqual(CountingModel.runs, 1)
+        self.assertEqual(len(planner), 0)
+        for q, f in zip(queries, futures):
+            a = f.result()
+            self.assertEqual(len(a), 2)
+            self.assertEqual(list(a.arrival_number), [0, 1])
+            self.assertEqual(list(a.index), [1, 2])
+            self.assertEqual((a.tx_depth[1], a.rx_depth[1], a.rx_range[1]), q)
+            self.assertEqual(list(a.rx_range_ndx), [0, 0])
+        self.assertEqual(planner.flush(), 0)
+        f = planner.submit(5, 50, 1000)
+        planner.flush()
+        self.assertRaises(ValueError, f.result)
+
+    def test_eigenray_map(self):
+        uwapm._models.insert(0, ('counting', CountingModel))
+        envs = []
+        def eigenray_run(self, env, task, debug=False, **kwargs):
+            envs.append(env)
+            rd = np.atleast_1d(env['rx_depth'])
+            rr = np.atleast_1d(env['rx_range'])
+            if task == uwapm.eigenrays:
+                return pd.DataFrame({
+                    'angle_of_departure': [-10.0, -2.0, 3.0, 8.0],
+                    'surface_bounces': [0, 0, 1, 1],
+                    'bottom_bounces': [1, 0, 0, 1],
+                    'ray': [np.zeros((2, 2))+j for j in range(4)]
+                })
+            return pd.DataFrame({
+                'tx_depth_ndx': [0]*5,
+                'rx_depth_ndx': [0, 0, 1, 1, 0],
+                'rx_range_ndx': [0, 0, 0, 0, rr.size-1],
+                'rx_depth': [rd[0], rd[0], rd[-1], rd[-1], rd[0]],
+                'rx_range': [rr[0], rr[0], rr[0], rr[0], rr[-1]],
+                'angle_of_departure': [-2.001, 3.001, -9.999, 7.5, 8.2],
+                'surface_bounces': [0, 1, 0, 1, 2],
+                'bottom_bounces': [0, 0, 1, 1, 2]
+            })
+        CountingModel.run = eigenray_run
+        env = uwapm.create_env2d(tx_depth=[5, 10], rx_depth=[5, 10, 15], rx_range=[500, 1000])
+        rays = uwapm.compute_eigenray_map(env, tx_depth_ndx=1, model='counting')
+        self.assertEqual(len(envs), 2)
+        self.assertEqual(envs[0]['tx_depth'], 10)
+        # the arrival at 7.5 deg is too far from the eigenray at 8 deg for the default beam spacing
+        self.assertEqual(len(rays), 3)
+        self.assertEqual(list(rays.loc[(0, 0)].angle_of_departure), [-2.0, 3.0])
+        self.assertEqual(list(rays.loc[(1, 0)].angle_of_departure), [-10.0])
+        self.assertEqual(rays.loc[(0, 0)].ray.iloc[1][0,0], 2)
+        rays = uwapm.compute_eigenray_map(dict(env, nbeams=100), tx_depth_ndx=1, model='counting')
+        self.assertEqual(list(rays.loc[(1, 0)].angle_of_departure), [-10.0, 8.0])
+        self.assertEqual(rays.loc[(1, 0)].ray.iloc[1][0,0], 3)
+        rays = uwapm.compute_eigenray_map(env, model='counting', receivers=[(2, 1), (1, 1)])
+        self.assertEqual(list(envs[4]['rx_depth']), [10, 15])
+        self.assertEqual(envs[4]['rx_range'], 1000)
+        self.assertEqual(list(rays.index.unique()), [(1, 1), (2, 1)])
+        self.assertEqual(rays.loc[(2, 1)].rx_depth.iloc[0], 15)
+        # a preferred model that only computes arrivals is not mixed in
+        class ArrivalsModel(CountingModel):
+            def supports(self, env=None, task=None):
+                return task == uwapm.arrivals
+            def run(self, env, task, debug=False, **kwargs):
+                raise AssertionError('arrivals model used')
+        uwapm._models.insert(0, ('arrivals', ArrivalsModel))
+        rays = uwapm.compute_eigenray_map(dict(env, nbeams=100), tx_depth_ndx=1)
+        self.assertEqual(len(rays), 4)
+
+    def test_stats_hook(self):
+        uwapm._models.insert(0, ('counting', CountingModel))
+        uwapm.set_cache(True, path=self.tmpdir)
+        stats = []
+        uwapm.set_stats_hook(stats.append)
+        env = uwapm.create_env2d()
+        a = uwapm.compute_arrivals(env, model='counting')
+        uwapm.compute_arrivals(env, model='counting')
+        self.assertEqual(len(stats), 2)
+        self.assertEqual((stats[0]['model'], stats[0]['task'], stats[0]['cached']), ('counting', uwapm.arrivals, False))
+        self.assertTrue(stats[1]['cached'])
+        self.assertEqual(stats[0]['result_size'], a.memory_usage().sum())
+        self.assertGreaterEqual(stats[0]['total_time'], 0)
+        exe = os.path.join(self.tmpdir, 'bellhop.exe')
+        with open(exe, 'w') as f:
+            f.write('#!/bin/sh\necho x > $1.arr\n')
+        os.chmod(exe, 0o755)
+        path = os.environ['PATH']
+        os.environ['PATH'] = self.tmpdir + os.pathsep + path
+        try:
+            model = uwapm._Bellhop()
+            model._load_arrivals = lambda fname_base: pd.DataFrame({'ray': [np.zeros(10)]})
+            s = {}
+            r = model.run(env, uwapm.arrivals, stats=s)
+            self.assertEqual(len(r), 1)
+            self.assertEqual(s['output_size'], 2)
+            self.assertEqual(uwapm._result_size(r), r.memory_usage().sum()+80)
+            for k in ['env_write_time', 'run_wall_time', 'run_cpu_time', 'parse_time']:
+                self.assertGreaterEqual(s[k], 0)
+            # queueing for an asynchronous slot is not counted as run time
+            with open(exe, 'w') as f:
+                f.write('#!/bin/sh\nsleep 0.2\necho x > $1.arr\n')
+            workers = uwapm._async_workers
+            uwapm.set_async_workers(1)
+            s = [{}, {}]
+            async def queries():
+                return await asyncio.gather(*[model.run_async(env, uwapm.arrivals, stats=x) for x in s])
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(queries())
+            finally:
+                loop.close()
+                uwapm.set_async_workers(workers)
+            for x in s:
+                self.assertGreaterEqual(x['run_wall_time'], 0.2)
+                self.assertLess(x['run_wall_time'], 0.35)
+                self.assertNotIn('run_cpu_time', x)
+        finally:
+            os.environ['PATH'] = path
+
+    def test_fake_bellhop(self):
+        path = os.environ['PATH']
+        os.environ['PATH'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bin') + os.pathsep + path
+        try:
+            uwapm.invalidate_models()
+            self.assertEqual(uwapm.models(), ['image', 'bellhop'])
+            env = uwapm.create_env2d(tx_depth=[5, 10], rx_depth=[5, 10, 15], rx_range=[500, 1000])
+            self.assertEqual(uwapm.models(env, uwapm.arrivals), ['image', 'bellhop'])
+            self.assertEqual(uwapm.models(env, uwapm.rays), ['bellhop'])
+            a = uwapm.compute_arrivals(env, model='bellhop')
+            self.assertEqual(sorted(a.rx_depth.unique()), [5, 10, 15])
+            self.assertEqual(sorted(a.rx_range.unique()), [500, 1000])
+            self.assertEqual(sorted(a.tx_depth.unique()), [5, 10])
+            r = uwapm.compute_rays(env)
+            self.assertEqual(len(r), 100)
+            tloss = uwapm.compute_transmission_loss(env, tx_depth_ndx=1)
+            self.assertEqual(tloss.shape, (3, 2))
+            self.assertEqual(list(tloss.columns), [500, 1000])
+        finally:
+            os.environ['PATH'] = path
+            uwapm.invalidate_models()
+
+    def test_save_results(self):
+        fname_base = os.path.join(self.tmpdir, 'test')
+        fake_bellhop.write_arr(fname_base+'.arr', 25000, [5.0, 10.0], [10.0, 20.0], [500.0, 1000.0], 5)
+        model = uwapm._Bellhop()
+        a = model._load_arrivals(fname_base)
+        path = os.path.join(self.tmpdir, 'arrivals')
+        uwapm.save_results(a, path)
+        b = uwapm.load_results(path)
+        self.assertEqual(list(b.columns), list(a.columns))
+        self.assertEqual(list(b.index), list(a.index))
+        self.assertEqual(b.rx_depth_ndx.dtype, np.int16)
+        self.assertEqual(b.angle_of_departure.dtype, np.float32)
+        self.assertEqual(b.arrival_amplitude.dtype, np.complex64)
+        self.assertArrayEqual(b.time_of_arrival.values, a.time_of_arrival.values)
+        self.assertArrayEqual(b.arrival_amplitude.values, a.arrival_amplitude.values, precision=6)
+        self.assertArrayEqual(b.angle_of_arrival.values, a.angle_of_arrival.values, precision=4)
+        b = uwapm.load_results(path, columns=['time_of_arrival', 'rx_range'], mmap_mode='r')
+        self.assertEqual(list(b.columns), ['time_of_arrival', 'rx_range'])
+        self.assertRaises(KeyError, uwapm.load_results, path, columns=['time'])
+        uwapm.save_results(a, path, compact=False)
+        self.assertTrue(uwapm.load_results(path).equals(a))
+        fake_bellhop.write_ray(fname_base+'.ray', 25000, 10.0, 25.0, 1000.0, 20, 30)
+        r = model._load_rays(fname_base)
+        path = os.path.join(self.tmpdir, 'rays')
+        uwapm.save_results(r, path)
+        s = uwapm.load_results(path, mmap_mode='r')
+        self.assertEqual(len(s), 20)
+        self.assertEqual(s.surface_bounces.dtype, np.int16)
+        for j in range(20):
+            self.assertEqual(s.ray[j].shape, r.ray[j].shape)
+            self.assertEqual(s.ray[j].dtype, np.float32)
+            self.assertArrayEqual(s.ray[j], r.ray[j], precision=3)
+        uwapm.save_results(r, path, compact=False)
+        s = uwapm.load_results(path)
+        self.assertEqual(s.ray[0].dtype, np.float64)
+        self.assertTrue(all(np.array_equal(x, y) for x, y in zip(s.ray, r.ray)))
+        self.write_shd(fname_base+'.shd', 1, 1, 4, 5)
+        tloss = model._load_shd(fname_base)
+        path = os.path.join(self.tmpdir, 'tloss')
+        uwapm.save_results(tloss, path)
+        t = uwapm.load_results(path, mmap_mode='r')
+        self.assertEqual(t.values.dtype, np.complex64)
+        self.assertArrayEqual(t.index, tloss.index)
+        self.assertArrayEqual(t.columns, tloss.columns)
+        self.assertArrayEqual(t.values, tloss.values, precision=6)
+        t = uwapm.load_results(path, columns=[100.0, 300.0])
+        self.assertArrayEqual(t.values, tloss.values[:,[1,3]], precision=6)
+        # string index levels, as from a sweep over names
+        arr = model._load_arrivals(fname_base)
+        a = pd.concat([arr.iloc[:2], arr.iloc[2:]], keys=['a', 'b'], names=['name'])
+        path = os.path.join(self.tmpdir, 'sweep')
+        uwapm.save_results(a, path)
+        b = uwapm.load_results(path)
+        self.assertEqual(list(b.index), list(a.index))
+        self.assertEqual(b.index.names, ['name', None])
+        self.assertEqual(len(b.loc['b']), len(arr)-2)
+
+    def test_image_method(self):
+        env = uwapm.create_env2d(depth=20, soundspeed=1500, tx_depth=5, rx_depth=[8, 15], rx_range=[100, 1000], frequency=1000)
+        self.assertEqual(uwapm.models(env, uwapm.arrivals)[0], 'image')
+        a = uwapm.compute_arrivals(env)
+        self.assertEqual(list(a.columns), ['tx_depth_ndx', 'rx_depth_ndx', 'rx_range_ndx', 'tx_depth', 'rx_depth', 'rx_range', 'arrival_number', 'arrival_amplitude', 'time_of_arrival', 'angle_of_departure', 'angle_of_arrival', 'surface_bounces', 'bottom_bounces'])
+        self.assertEqual(list(a.index), list(range(1, len(a)+1)))
+        a1 = a[(a.rx_depth_ndx == 0) & (a.rx_range_ndx == 0)]
+        self.assertEqual(list(a1.arrival_number), list(range(len(a1))))
+        self.assertTrue(np.all(np.diff(a1.time_of_arrival) >= 0))
+        d = a1.iloc[0]
+        self.assertEqual((d.surface_bounces, d.bottom_bounces), (0, 0))
+        self.assertApproxEqual(d.time_of_arrival, np.hypot(100, 3)/1500, precision=9)
+        self.assertApproxEqual(d.angle_of_departure, np.rad2deg(np.arctan2(3, 100)), precision=6)
+        self.assertApproxEqual(d.angle_of_arrival, d.angle_of_departure, precision=6)
+        self.assertApproxEqual(d.arrival_amplitude, uwa.absorption(1000, np.hypot(100, 3))/np.hypot(100, 3), precision=9)
+        s = a1[(a1.surface_bounces == 1) & (a1.bottom_bounces == 0)].iloc[0]
+        self.assertApproxEqual(s.time_of_arrival, np.hypot(100, 13)/1500, precision=9)
+        self.assertApproxEqual(s.angle_of_departure, -np.rad2deg(np.arctan2(13, 100)), precision=6)
+        self.assertApproxEqual(s.angle_of_arrival, -s.angle_of_departure, precision=6)
+        self.assertApproxEqual(s.arrival_amplitude, -uwa.absorption(1000, np.hypot(100, 13))/np.hypot(100, 13), precision=9)
+        b = a1[(a1.surface_bounces == 0) & (a1.bottom_bounces == 1)].iloc[0]
+        g = np.arctan2(27, 100)
+        self.assertApproxEqual(b.time_of_arrival, np.hypot(100, 27)/1500, precision=9)
+        self.assertApproxEqual(b.angle_of_departure, np.rad2deg(g), precision=6)
+        self.assertApproxEqual(b.arrival_amplitude, uwa.reflection_coeff(np.pi/2-g, 1600, 1600, 0.1/(40*np.pi*np.log10(np.e)), rho=1000, c=1500)*uwa.absorption(1000, np.hypot(100, 27))/np.hypot(100, 27), precision=9)
+        self.assertTrue(np.all(np.abs(a.angle_of_departure) <= 80))
+        env['min_angle'] = 0
+        a = uwapm.compute_arrivals(env)
+        self.assertTrue(np.all(a.angle_of_departure >= 0))
+
+    def test_arrivals(self):
+        env = uwapm.create_env2d(tx_depth=[5, 10], rx_depth=[5, 10, 15], rx_range=[500, 1000])
+        a = uwapm.compute_arrivals(env)
+        arr = uwapm.Arrivals(a)
+        self.assertEqual(len(arr), len(a))
+        self.assertEqual(arr.shape, (2, 3, 2))
+        self.assertArrayEqual(arr.rx_depth, [5, 10, 15])
+        self.assertEqual(arr.data['rx_depth_ndx'].dtype, np.int16)
+        self.assertEqual(arr.data['angle_of_departure'].dtype, np.float32)
+        self.assertEqual(arr.data['arrival_amplitude'].dtype, np.complex64)
+        self.assertEqual(arr.data['time_of_arrival'].dtype, np.float64)
+        r = arr.for_receiver(1, 2, 0)
+        m = a[(a.tx_depth_ndx == 1) & (a.rx_depth_ndx == 2) & (a.rx_range_ndx == 0)]
+        self.assertEqual(list(r.index), list(m.index))
+        self.assertTrue(r.dtypes.equals(m.dtypes))
+        self.assertArrayEqual(r.time_of_arrival.values, m.time_of_arrival.values)
+        self.assertArrayEqual(r.arrival_amplitude.values, m.arrival_amplitude.values, precision=6)
+        self.assertEqual(len(arr.for_receiver(2, 0, 0)), 0)
+        b = a.iloc[::-1]
+        self.assertTrue(uwapm.Arrivals.from_dataframe(b, compact=False).to_dataframe().equals(b))
+        self.assertTrue(uwapm.Arrivals(a, compact=False).for_receiver(1, 2, 0).equals(m))
+        c = arr.to_dataframe()
+        self.assertTrue(c.dtypes.equals(a.dtypes))
+        self.assertArrayEqual(c.angle_of_arrival.values, a.angle_of_arrival.values, precision=4)
+
+    def test_cache(self):
+        uwapm._models.insert(0, ('counting', CountingModel))
+        uwapm.set_cache(True, path=self.tmpdir)
+        env = uwapm.create_env2d()
+        a1 = uwapm.compute_arrivals(env, model='counting')
+        a2 = uwapm.compute_arrivals(uwapm.create_env2d(rx_range=1000.0), model='counting')
+        self.assertEqual(CountingModel.runs, 1)
+        self.assertTrue(a1.equals(a2))
+        uwapm.compute_arrivals(uwapm.create_env2d(rx_range=500), model='counting')
+        uwapm.compute_rays(env, model='counting')
+        self.assertEqual(CountingModel.runs, 3)
+        uwapm.set_cache(False)
+        uwapm.compute_arrivals(env, model='counting')
+        self.assertEqual(CountingModel.runs, 4)
+        uwapm.set_cache(True, max_size=0)
+        uwapm.compute_arrivals(uwapm.create_env2d(rx_range=200), model='counting')
+        self.assertEqual(len([f for f in os.listdir(self.tmpdir) if f.endswith('.pkl')]), 0)
+        uwapm.clear_cache()
+        self.assertFalse(os.path.exists(self.tmpdir))
+
 if __name__ == '__main__':
     unittest.main()